@@ -1,32 +1,173 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from pymongo import MongoClient
-from bson import ObjectId
-from datetime import datetime, timedelta
+from pymongo import MongoClient, ReturnDocument, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+from bson import ObjectId, json_util
+from bson.decimal128 import Decimal128
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 import bcrypt
 import jwt
 from functools import wraps
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import pytz
 from pprint import pprint
 import os
-import random
+import posixpath
+import shutil
+import base64
+import gzip
+import io
+import json
+import mimetypes
+import hashlib
+import tempfile
+import re
+import threading
+import time
+import statistics
+import click
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+from gridfs import GridFSBucket, NoFile
 from bson.errors import InvalidId
 
+# Optional media libraries: without them uploads are stored but get no previews
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+else:
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+# Optional: without it vehicles are approved without permits until it is installed
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+except ImportError:
+    serialization = Ed25519PrivateKey = None
+
 
 app = Flask(__name__)
 CORS(app)
 cat_tz = pytz.timezone('Africa/Harare')
 
+class BSONJSONProvider(DefaultJSONProvider):
+    # Encodes Mongo documents as they come back from pymongo: ObjectId and
+    # Decimal128 as strings, datetimes as ISO 8601 (naive ones are UTC, as
+    # pymongo returns them). Uses orjson when it is installed.
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime):
+            return (o if o.tzinfo else o.replace(tzinfo=timezone.utc)).isoformat()
+        if isinstance(o, date):
+            return o.isoformat()
+        if isinstance(o, Decimal128):
+            return str(o.to_decimal())
+        if isinstance(o, Decimal):
+            return str(o)
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault("default", self.default)
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            kwargs.setdefault("sort_keys", self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options(kwargs.get("indent"))).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+app.json = BSONJSONProvider(app)
+
 # Configuration
 UPLOAD_FOLDER = "uploads"
 app.config['SECRET_KEY'] = "eibgrlgnrwljfweufhewoufnbewjfwefjkebo"
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 
+# '' serves files from Python; 'x-accel-redirect' (nginx) or 'x-sendfile'
+# (Apache/lighttpd) hand the transfer to the front proxy
+app.config['FILE_OFFLOAD'] = os.environ.get('FILE_OFFLOAD', '').lower()
+app.config['FILE_OFFLOAD_PREFIX'] = os.environ.get('FILE_OFFLOAD_PREFIX', '/protected-uploads/')
+app.config['USE_X_SENDFILE'] = app.config['FILE_OFFLOAD'] == 'x-sendfile'
+app.config['FILE_MAX_AGE'] = int(os.environ.get('FILE_MAX_AGE', 3600))
+# 'local' keeps uploads under UPLOAD_FOLDER; 'gridfs' shares them across API nodes
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local').lower()
+app.config['GRIDFS_BUCKET'] = os.environ.get('GRIDFS_BUCKET', 'uploads')
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+app.config['JOB_RETRY_DELAY'] = float(os.environ.get('JOB_RETRY_DELAY', 5))
+app.config['JOB_LEASE'] = int(os.environ.get('JOB_LEASE', 300))
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 5))
+app.config['JOB_POLLER'] = os.environ.get('JOB_POLLER', 'true').lower() == 'true'
+app.config['ORPHAN_GRACE'] = int(os.environ.get('ORPHAN_GRACE', 3600))
+app.config['BLOB_CLAIM_WAIT'] = int(os.environ.get('BLOB_CLAIM_WAIT', 5))
+app.config['MEDIA_WORKERS'] = int(os.environ.get('MEDIA_WORKERS', 2))
+app.config['MEDIA_THUMBNAIL_SIZE'] = int(os.environ.get('MEDIA_THUMBNAIL_SIZE', 320))
+app.config['MEDIA_PREVIEW_SIZE'] = int(os.environ.get('MEDIA_PREVIEW_SIZE', 1280))
+app.config['MEDIA_OPTIMIZE_SIZE'] = int(os.environ.get('MEDIA_OPTIMIZE_SIZE', 2560))
+app.config['MEDIA_OPTIMIZE_MIN_BYTES'] = int(os.environ.get('MEDIA_OPTIMIZE_MIN_BYTES', 2 * 1024 * 1024))
+app.config['MEDIA_JPEG_QUALITY'] = int(os.environ.get('MEDIA_JPEG_QUALITY', 82))
+app.config['ID_WIDTH'] = int(os.environ.get('ID_WIDTH', 7))
+app.config['ID_BLOCK_SIZE'] = int(os.environ.get('ID_BLOCK_SIZE', 20))
+app.config['PRINCIPAL_CACHE_TTL'] = float(os.environ.get('PRINCIPAL_CACHE_TTL', 30))
+app.config['PRINCIPAL_CACHE_SIZE'] = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 1024))
+app.config['RESPONSE_CACHE_TTL'] = float(os.environ.get('RESPONSE_CACHE_TTL', 60))
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+app.config['CLIENT_DASHBOARD_TTL'] = float(os.environ.get('CLIENT_DASHBOARD_TTL', 5))
+app.config['CLIENT_DASHBOARD_CACHE_SIZE'] = int(os.environ.get('CLIENT_DASHBOARD_CACHE_SIZE', 1024))
+app.config['BCRYPT_ROUNDS'] = int(os.environ.get('BCRYPT_ROUNDS', 12))
+app.config['BCRYPT_WORKERS'] = int(os.environ.get('BCRYPT_WORKERS', 4))
+app.config['MONGO_URI'] = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+app.config['MONGO_DB'] = os.environ.get('MONGO_DB', 'permit_administration')
+app.config['MONGO_POOL_SIZE'] = int(os.environ.get('MONGO_POOL_SIZE', 100))
+app.config['QUERY_WORKERS'] = int(os.environ.get('QUERY_WORKERS', 16))
+app.config['BCRYPT_MAX_QUEUE'] = int(os.environ.get('BCRYPT_MAX_QUEUE', 16))
+app.config['BCRYPT_RETRY_AFTER'] = int(os.environ.get('BCRYPT_RETRY_AFTER', 2))
+app.config['PLATE_FILTER_REFRESH'] = float(os.environ.get('PLATE_FILTER_REFRESH', 30))
+app.config['PLATE_FILTER_POLL'] = float(os.environ.get('PLATE_FILTER_POLL', 1))
+app.config['PLATE_BATCH_LIMIT'] = int(os.environ.get('PLATE_BATCH_LIMIT', 200))
+app.config['SYNC_SETTLE_SECONDS'] = int(os.environ.get('SYNC_SETTLE_SECONDS', 30))
+app.config['VIOLATION_BATCH_LIMIT'] = int(os.environ.get('VIOLATION_BATCH_LIMIT', 500))
+app.config['RECENT_VIOLATIONS_LIMIT'] = int(os.environ.get('RECENT_VIOLATIONS_LIMIT', 5))
+app.config['PERMIT_SIGNING_KEY'] = os.environ.get('PERMIT_SIGNING_KEY')
+app.config['PERMIT_KEY_PATH'] = os.environ.get('PERMIT_KEY_PATH', 'permit_signing.key')
 
 # MongoDB connection
-client = MongoClient("mongodb://localhost:27017/")
-db = client.permit_administration
+client = MongoClient(app.config['MONGO_URI'], maxPoolSize=app.config['MONGO_POOL_SIZE'])
+db = client[app.config['MONGO_DB']]
 
 # Collections
 users_collection = db.users
@@ -34,37 +175,1076 @@ applications_collection = db.applications
 vehicles_collection = db.vehicles
 officers_collection  = db.officers
 violations_collection = db.violations
-
-ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png', 'gif'}
+counters_collection = db.counters
+plate_cards_collection = db.plate_cards
+vehicle_tombstones_collection = db.vehicle_tombstones
+permit_revocations_collection = db.permit_revocations
+blobs_collection = db.blobs
+media_jobs_collection = db.media_jobs
+jobs_collection = db.jobs
+
+# Independent reads within a request run side by side on a shared pool. It never
+# holds more threads than the client has connections, so fan-out cannot queue
+# on the connection pool instead of the executor.
+query_executor = ThreadPoolExecutor(
+    max_workers=max(1, min(app.config['QUERY_WORKERS'], app.config['MONGO_POOL_SIZE'])),
+    thread_name_prefix="queries"
+)
+
+def timed_query(query):
+    started = time.perf_counter()
+    result = query()
+    return result, (time.perf_counter() - started) * 1000
+
+def fan_out(**queries):
+    started = time.perf_counter()
+    futures = {name: query_executor.submit(timed_query, query) for name, query in queries.items()}
+    results, timings = {}, g.setdefault("server_timing", [])
+    for name, future in futures.items():
+        results[name], elapsed = future.result()
+        timings.append((name, elapsed))
+    timings.append(("fanout", (time.perf_counter() - started) * 1000))
+    return results
+
+@app.after_request
+def add_server_timing(response):
+    timings = g.pop("server_timing", None)
+    if timings:
+        response.headers["Server-Timing"] = ", ".join(f"{name};dur={elapsed:.1f}" for name, elapsed in timings)
+    return response
+
+# Index manifest, applied by ensure_indexes() at startup or with `flask indexes ensure`
+INDEX_MANIFEST = {
+    "users": [
+        {"keys": [("email", 1)], "name": "email_unique", "unique": True,
+         "partialFilterExpression": {"email": {"$type": "string"}}},
+        {"keys": [("role", 1), ("status", 1), ("createdAt", 1)], "name": "role_status_createdAt"},
+        {"keys": [("createdAt", 1), ("_id", 1)], "name": "createdAt_id"},
+        {"keys": [("businessInformation.companyName", 1)], "name": "companyName"},
+    ],
+    "applications": [
+        {"keys": [("applicationId", 1)], "name": "applicationId_unique", "unique": True},
+        {"keys": [("applicationId", 1), ("version", 1)], "name": "applicationId_version"},
+        {"keys": [("ownerID", 1), ("status", 1), ("createdAt", 1)], "name": "ownerID_status_createdAt"},
+        {"keys": [("ownerID", 1), ("createdAt", 1), ("_id", 1)], "name": "ownerID_createdAt_id"},
+        {"keys": [("status", 1), ("createdAt", -1), ("_id", -1)], "name": "status_createdAt_id"},
+        {"keys": [("createdAt", -1), ("_id", -1)], "name": "createdAt_id"},
+    ],
+    "vehicles": [
+        {"keys": [("vehicleId", 1)], "name": "vehicleId_unique", "unique": True},
+        {"keys": [("registrationNumber", 1)], "name": "registrationNumber_unique", "unique": True},
+        {"keys": [("normalizedPlate", 1)], "name": "normalizedPlate_unique", "unique": True,
+         "partialFilterExpression": {"normalizedPlate": {"$type": "string"}}},
+        {"keys": [("ownerID", 1), ("status", 1), ("createdAt", 1)], "name": "ownerID_status_createdAt"},
+        {"keys": [("plateKey", 1)], "name": "plateKey"},
+        {"keys": [("version", 1)], "name": "version"},
+        {"keys": [("ownerID", 1), ("registrationNumber", 1), ("_id", 1)], "name": "ownerID_registrationNumber_id"},
+        {"keys": [("status", 1), ("createdAt", 1), ("_id", 1)], "name": "status_createdAt_id"},
+        {"keys": [("createdAt", 1), ("_id", 1)], "name": "createdAt_id"},
+    ],
+    "officers": [
+        {"keys": [("badgeNumber", 1)], "name": "badgeNumber_unique", "unique": True},
+        {"keys": [("email", 1)], "name": "email_unique", "unique": True,
+         "partialFilterExpression": {"email": {"$type": "string"}}},
+        {"keys": [("status", 1), ("createdAt", 1), ("_id", 1)], "name": "status_createdAt_id"},
+        {"keys": [("createdAt", 1), ("_id", 1)], "name": "createdAt_id"},
+    ],
+    "violations": [
+        {"keys": [("vehicle_id", 1), ("date", -1), ("_id", -1)], "name": "vehicle_id_date_id"},
+        {"keys": [("date", -1), ("_id", -1)], "name": "date_id"},
+        {"keys": [("idempotencyKey", 1)], "name": "idempotencyKey_unique", "unique": True,
+         "partialFilterExpression": {"idempotencyKey": {"$type": "string"}}},
+    ],
+    "plate_cards": [
+        {"keys": [("vehicle_id", 1)], "name": "vehicle_id_unique", "unique": True},
+        {"keys": [("ownerID", 1)], "name": "ownerID"},
+        {"keys": [("plateKey", 1)], "name": "plateKey"},
+        {"keys": [("plateVariants", 1)], "name": "plateVariants"},
+    ],
+    "vehicle_tombstones": [
+        {"keys": [("version", 1)], "name": "version"},
+    ],
+    "permit_revocations": [
+        {"keys": [("seq", 1)], "name": "seq"},
+    ],
+    "media_jobs": [
+        {"keys": [("status", 1)], "name": "status"},
+    ],
+    "jobs": [
+        {"keys": [("status", 1), ("runAfter", 1)], "name": "status_runAfter"},
+    ],
+}
+
+def _index_options(spec):
+    return {key: value for key, value in spec.items() if key not in ("keys", "name")}
+
+def ensure_indexes():
+    report = {}
+    for collection_name, specs in INDEX_MANIFEST.items():
+        collection = db[collection_name]
+        created, failed = [], []
+        for spec in specs:
+            try:
+                collection.create_index(spec["keys"], name=spec["name"], **_index_options(spec))
+                created.append(spec["name"])
+            except OperationFailure as e:
+                app.logger.error(f"Could not create index {collection_name}.{spec['name']}: {e}")
+                failed.append({"name": spec["name"], "error": str(e)})
+        report[collection_name] = {"ensured": created, "failed": failed}
+    return report
+
+# Every serving process ensures the manifest once, on its first request, so
+# indexes that correctness depends on (idempotencyKey_unique, normalizedPlate_unique)
+# exist under flask run and WSGI servers too, not only under `python app.py`.
+indexes_ensured_pid = None
+indexes_lock = threading.Lock()
+
+def ensure_indexes_once():
+    global indexes_ensured_pid
+    if indexes_ensured_pid == os.getpid():
+        return
+    with indexes_lock:
+        if indexes_ensured_pid != os.getpid():
+            try:
+                ensure_indexes()
+                indexes_ensured_pid = os.getpid()
+            except PyMongoError as e:
+                app.logger.error(f"Index bootstrap failed, retrying on the next request: {e}")
+
+@app.before_request
+def bootstrap_indexes():
+    ensure_indexes_once()
+
+verified_indexes = set()
+
+def has_index(collection, name):
+    # Positive answers are cached; indexes are not dropped while the app runs
+    key = (collection.name, name)
+    if key not in verified_indexes and name in collection.index_information():
+        verified_indexes.add(key)
+    return key in verified_indexes
+
+def index_drift():
+    drift = {}
+    for collection_name, specs in INDEX_MANIFEST.items():
+        live = db[collection_name].index_information()
+        live.pop("_id_", None)
+        missing, mismatched = [], []
+
+        for spec in specs:
+            current = live.pop(spec["name"], None)
+            if current is None:
+                missing.append(spec["name"])
+                continue
+
+            expected_keys = [(field, direction) for field, direction in spec["keys"]]
+            live_keys = [(field, int(direction)) for field, direction in current.get("key", [])]
+            options = _index_options(spec)
+            if (
+                live_keys != expected_keys
+                or bool(current.get("unique")) != bool(options.get("unique"))
+                or current.get("partialFilterExpression") != options.get("partialFilterExpression")
+            ):
+                mismatched.append(spec["name"])
+
+        if missing or mismatched or live:
+            drift[collection_name] = {
+                "missing": missing,
+                "mismatched": mismatched,
+                "unexpected": sorted(live.keys()),
+            }
+    return drift
+
+@app.cli.group("indexes")
+def indexes_cli():
+    """Manage the MongoDB index manifest."""
+
+@indexes_cli.command("ensure")
+def ensure_indexes_command():
+    for collection_name, result in ensure_indexes().items():
+        print(f"{collection_name}: {len(result['ensured'])} ensured, {len(result['failed'])} failed")
+        for failure in result["failed"]:
+            print(f"  ! {failure['name']}: {failure['error']}")
+
+@indexes_cli.command("drift")
+def index_drift_command():
+    drift = index_drift()
+    if not drift:
+        print("Live indexes match the manifest")
+        return
+    for collection_name, result in drift.items():
+        for kind in ("missing", "mismatched", "unexpected"):
+            for name in result[kind]:
+                print(f"{collection_name}.{name}: {kind}")
+
+ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png', 'gif', 'heic', 'heif'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Files are addressed by path-like keys ("blobs/ab/cd/<sha256>", "derived/...",
+# or a legacy upload name) and live in the configured storage backend: the local
+# UPLOAD_FOLDER by default, or GridFS so every API node sees the same files.
+class LocalStorage:
+    def path(self, key):
+        return os.path.join(app.config['UPLOAD_FOLDER'], *key.split("/"))
+
+    def temp_dir(self):
+        path = os.path.join(app.config['UPLOAD_FOLDER'], "blobs", "tmp")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+    def put(self, key, stream):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write beside the target and rename so a reader never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(stream, tmp, BLOB_CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_file(self, key, tmp_path):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        for key in keys:
+            path = self.path(key)
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception as e:
+                    print(f"Failed to delete file {path}: {e}")
+
+    def keys(self, prefix=""):
+        root = app.config['UPLOAD_FOLDER']
+        for directory, _, names in os.walk(root):
+            for name in names:
+                key = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+                if key.startswith(prefix) and not key.startswith("blobs/tmp/") and not name.endswith(".tmp"):
+                    yield key
+
+    def respond(self, key, download_name, etag=None, as_attachment=True):
+        return file_response(self.path(key), download_name, etag, as_attachment)
+
+class GridFSStorage:
+    # Keys are GridFS filenames. A rewrite uploads a new revision before the old
+    # one is removed, so concurrent readers always find a complete file.
+    def __init__(self, database, bucket_name):
+        self.bucket = GridFSBucket(database, bucket_name=bucket_name, chunk_size_bytes=BLOB_CHUNK_SIZE * 4)
+        self.files = database[f"{bucket_name}.files"]
+        self.chunks = database[f"{bucket_name}.chunks"]
+
+    def temp_dir(self):
+        return None
+
+    def exists(self, key):
+        return self.files.count_documents({"filename": key}, limit=1) > 0
+
+    def size(self, key):
+        latest = self.files.find_one({"filename": key}, {"length": 1}, sort=[("uploadDate", -1)])
+        if not latest:
+            raise NoFile(key)
+        return latest["length"]
+
+    def open(self, key):
+        return self.bucket.open_download_stream_by_name(key)
+
+    def put(self, key, stream):
+        file_id = self.bucket.upload_from_stream(key, stream)
+        for old in self.files.find({"filename": key, "_id": {"$ne": file_id}}, {"_id": 1}):
+            try:
+                self.bucket.delete(old["_id"])
+            except NoFile:
+                pass
+
+    def put_file(self, key, tmp_path):
+        with open(tmp_path, "rb") as stream:
+            self.put(key, stream)
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        # Two round trips for the whole batch instead of two per file
+        file_ids = [grid_file["_id"] for grid_file in self.files.find({"filename": {"$in": list(keys)}}, {"_id": 1})]
+        if file_ids:
+            self.files.delete_many({"_id": {"$in": file_ids}})
+            self.chunks.delete_many({"files_id": {"$in": file_ids}})
+
+    def keys(self, prefix=""):
+        seen = set()
+        for grid_file in self.files.find({"filename": {"$regex": f"^{re.escape(prefix)}"}}, {"filename": 1}):
+            if grid_file["filename"] not in seen:
+                seen.add(grid_file["filename"])
+                yield grid_file["filename"]
+
+    def respond(self, key, download_name, etag=None, as_attachment=True):
+        grid_out = self.bucket.open_download_stream_by_name(key)
+        download_name = download_name or posixpath.basename(key)
+        response = Response(
+            wrap_file(request.environ, grid_out, BLOB_CHUNK_SIZE),
+            mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream",
+            direct_passthrough=True
+        )
+        response.content_length = grid_out.length
+        response.headers.set("Content-Disposition", "attachment" if as_attachment else "inline", filename=download_name)
+        response.set_etag(etag or str(grid_out._id))
+        response.last_modified = grid_out.upload_date
+        # Range requests seek within the GridFS file instead of reading past the prefix
+        response.make_conditional(request, accept_ranges=True, complete_length=grid_out.length)
+        return private_cache(response)
+
+# Uploads are stored once per distinct content under blobs/ab/cd/<sha256> and
+# referenced from documents as "blob:<sha256>/<filename>"; blobs.refs counts
+# the references so a blob is removed with its last referencing document.
+BLOB_PREFIX = "blob:"
+BLOB_CHUNK_SIZE = 64 * 1024
+
+def blob_key(digest):
+    return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+
+def legacy_key(ref):
+    # Files saved before the blob store, referenced as uploads/<timestamp>_<name>
+    if not isinstance(ref, str) or not ref.startswith("uploads/"):
+        return None
+    key = posixpath.normpath(ref[len("uploads/"):])
+    if key == "." or safe_join(app.config['UPLOAD_FOLDER'], key) is None:
+        return None
+    return key
+
+def parse_blob_ref(ref):
+    if not isinstance(ref, str) or not ref.startswith(BLOB_PREFIX):
+        return None, None
+    digest, _, filename = ref[len(BLOB_PREFIX):].partition("/")
+    if len(digest) != 64 or digest.strip("0123456789abcdef"):
+        return None, None
+    return digest, filename or digest
+
+class BlobStoreBusy(Exception):
+    pass
+
+def store_blob(stream, filename, content_type=None):
+    fd, tmp_path = tempfile.mkstemp(dir=storage.temp_dir())
+    try:
+        hasher, size = hashlib.sha256(), 0
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in iter(lambda: stream.read(BLOB_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        digest = hasher.hexdigest()
+
+        # A blob claimed by drop_files is never revived: the upsert skips it and
+        # the insert collides until the drop deletes the doc. A claim older than
+        # a job lease belongs to a crashed drop and is taken over; short of that
+        # the upload gives up after BLOB_CLAIM_WAIT seconds.
+        deadline = time.monotonic() + app.config['BLOB_CLAIM_WAIT']
+        while True:
+            try:
+                result = blobs_collection.update_one(
+                    {"_id": digest, "$or": [
+                        {"dropping": {"$exists": False}},
+                        {"droppingAt": {"$lt": datetime.now(cat_tz) - timedelta(seconds=app.config['JOB_LEASE'])}}
+                    ]},
+                    {
+                        "$inc": {"refs": 1},
+                        "$set": {"lastReferencedAt": datetime.now(cat_tz)},
+                        "$unset": {"dropping": "", "droppingAt": ""},
+                        "$setOnInsert": {"size": size, "contentType": content_type, "createdAt": datetime.now(cat_tz)}
+                    },
+                    upsert=True
+                )
+                break
+            except DuplicateKeyError:
+                if time.monotonic() >= deadline:
+                    raise BlobStoreBusy(digest)
+                time.sleep(0.05)
+        if result.upserted_id is not None or not storage.exists(blob_key(digest)):
+            storage.put_file(blob_key(digest), tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return f"{BLOB_PREFIX}{digest}/{filename}"
+
 def save_file(file):
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now(cat_tz).strftime('%Y%m%d_%H%M%S_')
-        filename = timestamp + filename
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        return f'uploads/{filename}'
+        return store_blob(file.stream, secure_filename(file.filename), file.mimetype)
     else:
         return False
+
+def release_files(refs):
+    # Reference counts drop immediately; unlinking the files is queued as one job
+    counts, legacy_keys = Counter(), []
+    for ref in refs:
+        digest, _ = parse_blob_ref(ref)
+        if digest:
+            counts[digest] += 1
+        elif legacy_key(ref):
+            legacy_keys.append(legacy_key(ref))
+
+    unreferenced = []
+    for digest, count in counts.items():
+        blob = blobs_collection.find_one_and_update(
+            {"_id": digest}, {"$inc": {"refs": -count}}, return_document=ReturnDocument.AFTER
+        )
+        if blob and blob["refs"] <= 0:
+            unreferenced.append(digest)
+
+    if unreferenced or legacy_keys:
+        enqueue_job("drop_files", {"digests": unreferenced, "keys": legacy_keys})
+
+def drop_files(digests, keys=()):
+    # Unreferenced blobs are claimed, unlinked, then deleted, so store_blob briefly
+    # waits for the doc to go rather than reuse a file that is being removed. Safe to
+    # re-run: a retry reclaims blobs a crashed attempt left behind.
+    claimed = []
+    if digests:
+        token = ObjectId()
+        # $min keeps the time of the first claim, so a retried drop does not
+        # postpone the takeover of a claim its crashed attempt left behind
+        blobs_collection.update_many(
+            {"_id": {"$in": digests}, "refs": {"$lte": 0}},
+            {"$set": {"dropping": token}, "$min": {"droppingAt": datetime.now(cat_tz)}}
+        )
+        claimed = blobs_collection.distinct("_id", {"_id": {"$in": digests}, "dropping": token})
+        media_jobs_collection.delete_many({"_id": {"$in": claimed}})
+    storage.delete_many(
+        [blob_key(digest) for digest in claimed]
+        + [derived_key(digest, name) for digest in claimed for name in MEDIA_DERIVATIVES]
+        + list(keys)
+    )
+    if claimed:
+        blobs_collection.delete_many({"_id": {"$in": claimed}, "dropping": token})
+    return len(claimed) + len(keys)
+
+def private_cache(response):
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['FILE_MAX_AGE']
+    return response
+
+def file_response(full_path, download_name, etag=None, as_attachment=True):
+    # Blobs pass their SHA-256 as a strong ETag; legacy files fall back to mtime and size
+    download_name = download_name or os.path.basename(full_path)
+    if app.config['FILE_OFFLOAD'] == 'x-accel-redirect':
+        stat = os.stat(full_path)
+        relative = os.path.relpath(full_path, app.config['UPLOAD_FOLDER']).replace(os.sep, "/")
+        response = Response(mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = app.config['FILE_OFFLOAD_PREFIX'].rstrip("/") + "/" + relative
+        response.headers.set("Content-Disposition", "attachment" if as_attachment else "inline", filename=download_name)
+        response.set_etag(etag or f"{int(stat.st_mtime)}-{stat.st_size}")
+        response.last_modified = stat.st_mtime
+        # 304s are answered here; nginx serves the bytes and any Range request
+        response.make_conditional(request)
+    else:
+        response = send_file(full_path, as_attachment=as_attachment, download_name=download_name,
+                             etag=etag or True, conditional=True)
+    return private_cache(response)
+
+storage = GridFSStorage(db, app.config['GRIDFS_BUCKET']) if app.config['STORAGE_BACKEND'] == 'gridfs' else LocalStorage()
+
+@app.cli.group("storage")
+def storage_cli():
+    """Move uploaded files between storage backends."""
+
+@storage_cli.command("migrate")
+@click.option("--workers", default=8, show_default=True, help="Files copied concurrently.")
+@click.option("--delete-local", is_flag=True, help="Remove each local file once its GridFS copy is verified.")
+def migrate_storage_command(workers, delete_local):
+    source, target = LocalStorage(), GridFSStorage(db, app.config['GRIDFS_BUCKET'])
+
+    def copy(key):
+        try:
+            if target.exists(key):
+                status = "skipped"
+            else:
+                with source.open(key) as stream:
+                    target.put(key, stream)
+                status = "copied"
+            if delete_local and target.size(key) == source.size(key):
+                source.delete(key)
+            return status
+        except Exception as e:
+            print(f"  failed: {key}: {e}")
+            return "failed"
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-migrate") as executor:
+        for status in executor.map(copy, list(source.keys())):
+            counts[status] = counts.get(status, 0) + 1
+    print(f"Migrated uploads to GridFS bucket '{app.config['GRIDFS_BUCKET']}': {counts}")
+
+LEGACY_UPLOAD_PREFIX = re.compile(r"^\d{8}_\d{6}_")
+
+@app.cli.group("uploads")
+def uploads_cli():
+    """Maintain the content-addressed upload store."""
+
+@uploads_cli.command("migrate")
+def migrate_uploads_command():
+    # Moves files saved as uploads/<timestamp>_<name> into the blob store,
+    # collapsing copies of the same document into one blob
+    migrated, missing, legacy_keys = 0, 0, set()
+    for collection in (applications_collection, vehicles_collection):
+        for document in collection.find({"uploadedFiles": {"$exists": True}}, {"uploadedFiles": 1}):
+            updates = {}
+            for field, ref in (document.get("uploadedFiles") or {}).items():
+                key = legacy_key(ref)
+                if not key:
+                    continue
+                if not storage.exists(key):
+                    missing += 1
+                    continue
+                filename = LEGACY_UPLOAD_PREFIX.sub("", posixpath.basename(key))
+                with storage.open(key) as source:
+                    updates[f"uploadedFiles.{field}"] = store_blob(source, filename, mimetypes.guess_type(filename)[0])
+                legacy_keys.add(key)
+            if updates:
+                collection.update_one({"_id": document["_id"]}, {"$set": updates})
+                migrated += len(updates)
+
+    for key in legacy_keys:
+        storage.delete(key)
+    stored = blobs_collection.count_documents({})
+    print(f"Migrated {migrated} file references ({len(legacy_keys)} files, {missing} missing) into {stored} blobs")
+
+# Uploaded images and PDFs get JPEG derivatives (thumbnail, preview and, for
+# oversized photos, a size-capped copy) rendered off the request path. There
+# is one media job per blob, so a document uploaded twice is rendered once.
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'heic', 'heif'}
+MEDIA_DERIVATIVES = ("thumb", "preview", "optimized")
+class MediaUnsupported(Exception):
+    pass
+
+def media_kind(filename):
+    extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    if extension == "pdf":
+        return "pdf"
+    return None
+
+def derived_key(digest, name):
+    return f"derived/{digest[:2]}/{digest[2:4]}/{digest}-{name}.jpg"
+
+def create_media_jobs(refs):
+    created = []
+    for ref in refs:
+        digest, filename = parse_blob_ref(ref)
+        kind = media_kind(filename) if digest else None
+        if not kind:
+            continue
+        result = media_jobs_collection.update_one(
+            {"_id": digest},
+            {"$setOnInsert": {"kind": kind, "status": "pending", "derivatives": [], "attempts": 0,
+                              "createdAt": datetime.now(cat_tz)}},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            created.append(digest)
+    return created
+
+def enqueue_media(refs):
+    # Runs on the leased jobs queue so work lost to a restart is picked up again
+    try:
+        digests = create_media_jobs(refs)
+        if digests:
+            enqueue_job("process_media", {"digests": digests})
+    except PyMongoError as e:
+        app.logger.error(f"Failed to queue media processing: {e}")
+
+def open_media(kind, source):
+    if Image is None:
+        raise MediaUnsupported("Pillow is not installed")
+    if kind == "pdf":
+        if pypdfium2 is None:
+            raise MediaUnsupported("pypdfium2 is not installed")
+        # pdfium only reads real files; GridFS streams are bounded by MAX_CONTENT_LENGTH
+        pdf = pypdfium2.PdfDocument(source if isinstance(source, io.BufferedIOBase) else source.read())
+        try:
+            page = pdf[0]
+            scale = app.config['MEDIA_PREVIEW_SIZE'] / max(page.get_size())
+            return page.render(scale=scale).to_pil().convert("RGB")
+        finally:
+            pdf.close()
+    # exif_transpose returns a loaded copy, so the source can be closed afterwards
+    return ImageOps.exif_transpose(Image.open(source))
+
+def flatten_image(image):
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+def write_derivatives(digest, image, source_size):
+    sizes = [("thumb", app.config['MEDIA_THUMBNAIL_SIZE']), ("preview", app.config['MEDIA_PREVIEW_SIZE'])]
+    optimize_size = app.config['MEDIA_OPTIMIZE_SIZE']
+    if optimize_size and source_size >= app.config['MEDIA_OPTIMIZE_MIN_BYTES'] and max(image.size) > optimize_size:
+        sizes.append(("optimized", optimize_size))
+
+    written = []
+    for name, side in sizes:
+        rendition = image.copy()
+        rendition.thumbnail((side, side))
+        encoded = io.BytesIO()
+        rendition.save(encoded, "JPEG", quality=app.config['MEDIA_JPEG_QUALITY'], optimize=True, progressive=True)
+        encoded.seek(0)
+        storage.put(derived_key(digest, name), encoded)
+        written.append(name)
+    return written
+
+def process_media(digest):
+    # A row left in processing belongs to an attempt whose lease expired; re-running it is safe
+    job = media_jobs_collection.find_one_and_update(
+        {"_id": digest, "status": {"$in": ["pending", "processing"]}},
+        {"$set": {"status": "processing", "startedAt": datetime.now(cat_tz)}, "$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not job:
+        return
+
+    try:
+        with storage.open(blob_key(digest)) as source:
+            image = open_media(job["kind"], source)
+        with image:
+            derivatives = write_derivatives(digest, flatten_image(image), storage.size(blob_key(digest)))
+        update = {"status": "done", "derivatives": derivatives, "error": None}
+    except MediaUnsupported as e:
+        update = {"status": "unsupported", "error": str(e)}
+    except Exception as e:
+        app.logger.error(f"Media processing failed for blob {digest}: {e}")
+        update = {"status": "failed", "error": str(e)}
+
+    update["finishedAt"] = datetime.now(cat_tz)
+    media_jobs_collection.update_one({"_id": digest}, {"$set": update})
+
+
+@app.cli.group("media")
+def media_cli():
+    """Render previews for uploaded documents."""
+
+@media_cli.command("process")
+@click.option("--retry", is_flag=True, help="Also re-run failed, unsupported and interrupted jobs.")
+def process_media_command(retry):
+    # Creates jobs for uploads that predate the pipeline, then drains pending jobs
+    created = 0
+    for collection in (applications_collection, vehicles_collection):
+        for document in collection.find({"uploadedFiles": {"$exists": True}}, {"uploadedFiles": 1}):
+            created += len(create_media_jobs((document.get("uploadedFiles") or {}).values()))
+    if retry:
+        media_jobs_collection.update_many(
+            {"status": {"$in": ["processing", "failed", "unsupported"]}}, {"$set": {"status": "pending"}}
+        )
+
+    pending = [job["_id"] for job in media_jobs_collection.find({"status": "pending"}, {"_id": 1})]
+    with ThreadPoolExecutor(max_workers=app.config['MEDIA_WORKERS'], thread_name_prefix="media") as executor:
+        list(executor.map(process_media, pending))
+    statuses = {}
+    for job in media_jobs_collection.find({"_id": {"$in": pending}}, {"status": 1}):
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+    print(f"Created {created} media jobs, processed {len(pending)}: {statuses}")
     
-def serialize_application(application):
-    if application:
-        application['_id'] = str(application['_id'])
+# Work that need not finish inside a request (cascading deletes, file cleanup,
+# orphan scans) is stored in the jobs collection and run by an in-process pool.
+# Jobs are claimed atomically with a lease, so several API processes can share
+# the queue. Failed jobs back off exponentially and expired leases are re-run,
+# which means handlers must be safe to run twice.
+JOB_HANDLERS = {}
+job_executor = ThreadPoolExecutor(max_workers=app.config['JOB_WORKERS'], thread_name_prefix="jobs")
+
+def job_handler(job_type):
+    def register(fn):
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return register
+
+def enqueue_job(job_type, payload):
+    now = datetime.now(cat_tz)
+    job_id = jobs_collection.insert_one({
+        "type": job_type,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "runAfter": now,
+        "createdAt": now
+    }).inserted_id
+    job_executor.submit(drain_jobs)
+    return job_id
+
+def claim_job():
+    now = datetime.now(cat_tz)
+    return jobs_collection.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "runAfter": {"$lte": now}},
+            {"status": "running", "lockedUntil": {"$lt": now}}
+        ]},
+        {"$set": {"status": "running", "startedAt": now, "lockedUntil": now + timedelta(seconds=app.config['JOB_LEASE'])},
+         "$inc": {"attempts": 1}},
+        sort=[("runAfter", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def run_job(job):
+    try:
+        result = JOB_HANDLERS[job["type"]](job.get("payload") or {})
+        update = {"status": "done", "result": result, "error": None}
+    except Exception as e:
+        app.logger.error(f"Job {job['_id']} ({job['type']}) failed on attempt {job['attempts']}: {e}")
+        update = {"status": "failed", "error": str(e)}
+        if job["attempts"] < app.config['JOB_MAX_ATTEMPTS']:
+            delay = app.config['JOB_RETRY_DELAY'] * 2 ** (job["attempts"] - 1)
+            update.update({"status": "queued", "runAfter": datetime.now(cat_tz) + timedelta(seconds=delay)})
+    update["finishedAt"] = datetime.now(cat_tz)
+    jobs_collection.update_one({"_id": job["_id"]}, {"$set": update, "$unset": {"lockedUntil": ""}})
+    return update["status"]
+
+def drain_jobs():
+    ran = 0
+    while (job := claim_job()) is not None:
+        run_job(job)
+        ran += 1
+    return ran
+
+def poll_jobs():
+    # Picks up retries that have come due and jobs whose worker died mid-run
+    while True:
+        try:
+            drain_jobs()
+        except PyMongoError as e:
+            app.logger.error(f"Job poller failed: {e}")
+        time.sleep(app.config['JOB_POLL_INTERVAL'])
+
+job_poller_pid = None
+job_poller_lock = threading.Lock()
+
+def start_job_worker():
+    # One poller per serving process, started again in each forked worker
+    global job_poller_pid
+    if job_poller_pid == os.getpid():
+        return
+    with job_poller_lock:
+        if job_poller_pid != os.getpid():
+            threading.Thread(target=poll_jobs, name="jobs-poller", daemon=True).start()
+            job_poller_pid = os.getpid()
+
+@app.before_request
+def ensure_job_worker():
+    # Runs under any server; set JOB_POLLER=false when `flask jobs worker` runs separately
+    if app.config['JOB_POLLER']:
+        start_job_worker()
+
+def serialize_job(job):
+    return {
+        "id": str(job["_id"]),
+        "type": job["type"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "createdAt": job.get("createdAt"),
+        "finishedAt": job.get("finishedAt")
+    }
 
-        if 'createdAt' in application and isinstance(application['createdAt'], datetime):
-            application['createdAt'] = application['createdAt'].isoformat()
+@job_handler("drop_files")
+def drop_files_job(payload):
+    return {"deleted": drop_files(payload.get("digests", []), payload.get("keys", []))}
+
+@job_handler("process_media")
+def process_media_job(payload):
+    for digest in payload.get("digests", []):
+        process_media(digest)
+    return {"processed": len(payload.get("digests", []))}
+
+@job_handler("delete_operator")
+def delete_operator_job(payload):
+    # Deleting documents one at a time keeps a retry from releasing the same files twice
+    operator_id = payload["operatorId"]
+    refs, applications, vehicles = [], 0, []
+    for application in applications_collection.find({"ownerID": operator_id}, {"_id": 1}):
+        deleted = applications_collection.find_one_and_delete({"_id": application["_id"]})
+        if deleted:
+            applications += 1
+            refs.extend((deleted.get("uploadedFiles") or {}).values())
+    for vehicle in vehicles_collection.find({"ownerID": operator_id}, {"_id": 1}):
+        deleted = vehicles_collection.find_one_and_delete({"_id": vehicle["_id"]})
+        if deleted:
+            vehicles.append(deleted)
+            refs.extend((deleted.get("uploadedFiles") or {}).values())
+
+    if applications:
+        bump_application_lists([operator_id])
+    invalidate_client_dashboards([operator_id])
+    record_vehicle_tombstones(vehicles)
+    revoke_permits([vehicle.get("permit") for vehicle in vehicles], "vehicle_deleted")
+    sync_plate_cards(drop={"ownerID": operator_id})
+    for vehicle in vehicles:
+        registered_plates.discard(vehicle.get("registrationNumber", ""))
+    release_files(refs)
+    return {"applications": applications, "vehicles": len(vehicles), "files": len(refs)}
+
+def stray_blob_digest(key):
+    # The digest a blob or derivative file was stored under, or None for any other key
+    digest = posixpath.basename(key).split("-", 1)[0]
+    if not re.fullmatch(r"[0-9a-f]{64}", digest):
+        return None
+    if key == blob_key(digest) or key in {derived_key(digest, name) for name in MEDIA_DERIVATIVES}:
+        return digest
+    return None
+
+@job_handler("scan_orphans")
+def scan_orphans_job(payload):
+    # Reconciles stored files and blob reference counts with the uploadedFiles
+    # fields that point at them; reports only unless payload["apply"] is set
+    apply = bool(payload.get("apply"))
+    cutoff = datetime.now(cat_tz) - timedelta(seconds=app.config['ORPHAN_GRACE'])
+
+    references, legacy_refs = Counter(), set()
+    for collection in (applications_collection, vehicles_collection):
+        for document in collection.find({"uploadedFiles": {"$exists": True}}, {"uploadedFiles": 1}):
+            for ref in (document.get("uploadedFiles") or {}).values():
+                digest, _ = parse_blob_ref(ref)
+                if digest:
+                    references[digest] += 1
+                elif legacy_key(ref):
+                    legacy_refs.add(legacy_key(ref))
+
+    # Blobs referenced within the grace period may belong to an upload still in
+    # flight, including dedup hits on an old blob
+    miscounted, unreferenced = {}, {}
+    recent = {"$or": [
+        {"lastReferencedAt": {"$lt": cutoff}},
+        {"lastReferencedAt": {"$exists": False}, "createdAt": {"$lt": cutoff}}
+    ]}
+    for blob in blobs_collection.find(recent, {"refs": 1}):
+        actual = references.get(blob["_id"], 0)
+        if actual == 0:
+            unreferenced[blob["_id"]] = blob.get("refs")
+        elif actual != blob.get("refs"):
+            miscounted[blob["_id"]] = (blob.get("refs"), actual)
+
+    known = {blob["_id"] for blob in blobs_collection.find({}, {"_id": 1})}
+    stray_keys = []
+    for key in storage.keys():
+        name = posixpath.basename(key)
+        if key.startswith("blobs/"):
+            orphaned = name not in known
+        elif key.startswith("derived/"):
+            orphaned = name.split("-", 1)[0] not in known
+        else:
+            orphaned = key not in legacy_refs
+        if orphaned:
+            stray_keys.append(key)
+
+    # store_blob records the blob before writing its file, so any file the walk
+    # saw from an upload that started after `known` was read has its doc by now
+    stray_digests = {stray_blob_digest(key) for key in stray_keys} - {None}
+    if stray_digests:
+        known |= set(blobs_collection.distinct("_id", {"_id": {"$in": list(stray_digests)}}))
+        stray_digests -= known
+        stray_keys = [key for key in stray_keys if stray_blob_digest(key) not in known]
+    dangling = [digest for digest in references if digest not in known]
+
+    # Corrections only apply where refs still holds the value the scan observed,
+    # so counts changed by uploads or deletes since then are left alone
+    if apply:
+        for digest, (observed, actual) in miscounted.items():
+            blobs_collection.update_one({"_id": digest, "refs": observed}, {"$set": {"refs": actual}})
+        confirmed = [
+            digest for digest, observed in unreferenced.items()
+            if blobs_collection.update_one({"_id": digest, "refs": observed}, {"$set": {"refs": 0}}).matched_count
+        ]
+        # Stray blob files get a placeholder doc so drop_files claims them like any
+        # unreferenced blob: an upload of the same content then either bumps the
+        # placeholder before the claim (and keeps the file) or waits for the drop
+        for digest in stray_digests:
+            try:
+                blobs_collection.insert_one({"_id": digest, "refs": 0, "createdAt": datetime.now(cat_tz)})
+                confirmed.append(digest)
+            except DuplicateKeyError:
+                pass
+        drop_files(confirmed, [key for key in stray_keys if stray_blob_digest(key) is None])
 
-        if 'updatedAt' in application and isinstance(application['updatedAt'], datetime):
-            application['updatedAt'] = application['updatedAt'].isoformat()
-            
-        if 'timeline' in application and application['timeline']:
-            for event in application['timeline']:
-                if 'date' in event and isinstance(event['date'], datetime):
-                    event['date'] = event['date'].strftime('%Y-%m-%d')    
-    return application
+    return {
+        "applied": apply,
+        "miscountedBlobs": len(miscounted),
+        "unreferencedBlobs": len(unreferenced),
+        "strayFiles": len(stray_keys),
+        "danglingReferences": len(dangling),
+        "sample": {"unreferenced": list(unreferenced)[:20], "stray": stray_keys[:20], "dangling": dangling[:20]}
+    }
+
+@app.cli.group("jobs")
+def jobs_cli():
+    """Run and inspect background jobs."""
+
+@jobs_cli.command("run")
+def run_jobs_command():
+    print(f"Ran {drain_jobs()} jobs")
+
+@jobs_cli.command("worker")
+def jobs_worker_command():
+    print(f"Polling for jobs every {app.config['JOB_POLL_INTERVAL']}s")
+    poll_jobs()
+
+@jobs_cli.command("scan-orphans")
+@click.option("--apply", is_flag=True, help="Delete orphaned files and fix reference counts instead of reporting them.")
+def scan_orphans_command(apply):
+    job_id = enqueue_job("scan_orphans", {"apply": apply})
+    # The pool may have claimed the job already; wait for whichever worker runs it
+    while (job := jobs_collection.find_one({"_id": job_id}))["status"] in ("queued", "running"):
+        drain_jobs()
+        time.sleep(0.2)
+    print(json.dumps(serialize_job(job), default=str, indent=2))
+
+class TTLCache:
+    # Thread-safe LRU with a per-entry time to live; a ttl of 0 disables it
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+principal_cache = TTLCache(app.config['PRINCIPAL_CACHE_SIZE'], app.config['PRINCIPAL_CACHE_TTL'])
+
+def load_principal(collection, kind, user_id):
+    key = (kind, str(user_id))
+    principal = principal_cache.get(key)
+    if principal is None:
+        principal = collection.find_one({'_id': ObjectId(user_id)}, {'password': 0})
+        if principal:
+            principal_cache.set(key, principal)
+    # Handlers get their own copy so they cannot mutate the cached document
+    return dict(principal) if principal else None
+
+# Application responses carry a weak ETag built from a version: each application
+# document's own counter for the detail route, and counters bumped on every
+# application write for the lists. A matching If-None-Match costs one index
+# probe; otherwise the serialized body may still come from response_cache.
+response_cache = TTLCache(app.config['RESPONSE_CACHE_SIZE'], app.config['RESPONSE_CACHE_TTL'])
+
+def application_list_counters(owner_ids):
+    return ["applicationList"] + [f"applicationList:{owner_id}" for owner_id in set(owner_ids) if owner_id]
+
+# Per-owner dashboard counts; writes that change them invalidate the owner's entry
+dashboard_cache = TTLCache(app.config['CLIENT_DASHBOARD_CACHE_SIZE'], app.config['CLIENT_DASHBOARD_TTL'])
+
+def invalidate_client_dashboards(owner_ids):
+    for owner_id in set(owner_ids):
+        if owner_id:
+            dashboard_cache.invalidate(str(owner_id))
+
+def client_dashboard_stats(owner_id):
+    stats = dashboard_cache.get(owner_id)
+    if stats is None:
+        # One pass over the owner's applications on ownerID_status_createdAt
+        results = fan_out(
+            statuses=lambda: list(applications_collection.aggregate([
+                {"$match": {"ownerID": owner_id}},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ])),
+            registeredVehicles=lambda: vehicles_collection.count_documents({"ownerID": owner_id, "status": "approved"})
+        )
+        by_status = {row["_id"]: row["count"] for row in results["statuses"]}
+        stats = {
+            "totalApplications": sum(by_status.values()),
+            "activePermits": by_status.get("active", 0),
+            "registeredVehicles": results["registeredVehicles"],
+            "pendingReviews": by_status.get("pending", 0)
+        }
+        dashboard_cache.set(owner_id, stats)
+    return stats
+
+def bump_application_lists(owner_ids):
+    invalidate_client_dashboards(owner_ids)
+    counters_collection.bulk_write([
+        UpdateOne({"_id": counter_id}, {"$inc": {"value": 1}}, upsert=True)
+        for counter_id in application_list_counters(owner_ids)
+    ], ordered=False)
+
+def application_list_etag(owner_id=None):
+    # Read before the page is queried so a racing write can only make the body newer than its tag
+    counter_id = f"applicationList:{owner_id}" if owner_id else "applicationList"
+    counter = counters_collection.find_one({"_id": counter_id})
+    args = hashlib.sha1(request.query_string).hexdigest()[:12]
+    return f"{request.path}:{owner_id or 'all'}:{counter['value'] if counter else 0}:{args}"
+
+def tag_response(response, etag):
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def cached_response(etag):
+    if request.if_none_match.contains_weak(etag):
+        return tag_response(app.response_class(status=304), etag)
+    body = response_cache.get(etag)
+    if body is not None:
+        return tag_response(app.response_class(body, mimetype=app.json.mimetype), etag)
+    return None
+
+def versioned_response(etag, payload):
+    body = app.json.dumps(payload).encode("utf-8")
+    response_cache.set(etag, body)
+    return tag_response(app.response_class(body, mimetype=app.json.mimetype), etag)
 
 def token_required(f):
     @wraps(f)
@@ -83,7 +1263,7 @@ def token_required(f):
             if not user_id:
                 return {'message': 'Invalid token payload'}, 401
 
-            current_user = users_collection.find_one({'_id': ObjectId(user_id)})
+            current_user = load_principal(users_collection, "user", user_id)
             if not current_user:
                 return {'message': 'User not found'}, 401
 
@@ -137,7 +1317,7 @@ def officer_required(f):
             if not user_id:
                 return {'message': 'Invalid token payload'}, 401
 
-            current_user = officers_collection.find_one({'_id': ObjectId(user_id)})
+            current_user = load_principal(officers_collection, "officer", user_id)
             if not current_user:
                 return {'message': 'User not found'}, 401
 
@@ -151,30 +1331,1036 @@ def officer_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+class PasswordHasherBusy(Exception):
+    pass
+
+# bcrypt releases the GIL, so a small dedicated pool keeps hashing off the
+# request threads; callers beyond workers + queue are shed with a 503.
+password_executor = ThreadPoolExecutor(max_workers=app.config['BCRYPT_WORKERS'], thread_name_prefix="bcrypt")
+password_slots = threading.BoundedSemaphore(app.config['BCRYPT_WORKERS'] + app.config['BCRYPT_MAX_QUEUE'])
+
+def run_password_job(fn, *args):
+    if not password_slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        return password_executor.submit(fn, *args).result()
+    finally:
+        password_slots.release()
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    salt = bcrypt.gensalt(rounds=app.config['BCRYPT_ROUNDS'])
+    return run_password_job(bcrypt.hashpw, password.encode('utf-8'), salt)
+
+def check_password(password, hashed):
+    return run_password_job(bcrypt.checkpw, password.encode('utf-8'), hashed)
 
-def generate_random():
-    return str(random.randint(1, 99999)).zfill(5)
+def password_needs_rehash(hashed):
+    try:
+        return int(hashed.split(b"$")[2]) != app.config['BCRYPT_ROUNDS']
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+def upgraded_password_fields(password, hashed):
+    # Best effort: a busy hasher must not fail an otherwise valid login
+    if not password_needs_rehash(hashed):
+        return {}
+    try:
+        return {'password': hash_password(password)}
+    except PasswordHasherBusy:
+        return {}
+
+def busy_response():
+    return {
+        "success": False,
+        "message": "Server is busy, please try again shortly"
+    }, 503, {"Retry-After": str(app.config['BCRYPT_RETRY_AFTER'])}
+
+@app.errorhandler(PasswordHasherBusy)
+def handle_password_hasher_busy(error):
+    return busy_response()
+
+def blob_store_busy_response():
+    return {
+        "success": False,
+        "message": "A file is still being removed, please try again shortly"
+    }, 503, {"Retry-After": str(app.config['BLOB_CLAIM_WAIT'])}
+
+@app.errorhandler(BlobStoreBusy)
+def handle_blob_store_busy(error):
+    return blob_store_busy_response()
+
+class SequenceAllocator:
+    # Hands out ids from blocks reserved with an atomic $inc on the counters
+    # collection, so only one call in block_size touches the database.
+    def __init__(self, name, block_size):
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._next = 1
+        self._end = 0
+
+    def _reserve_block(self):
+        counter = counters_collection.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._end = counter["value"]
+        self._next = self._end - self.block_size + 1
+
+    def next(self):
+        with self._lock:
+            # A forked worker must not reuse the block its parent reserved
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next, self._end = 1, 0
+
+            if self._next > self._end:
+                self._reserve_block()
+
+            value = self._next
+            self._next += 1
+            return value
+
+application_ids = SequenceAllocator("applicationId", app.config['ID_BLOCK_SIZE'])
+vehicle_ids = SequenceAllocator("vehicleId", app.config['ID_BLOCK_SIZE'])
+badge_numbers = SequenceAllocator("badgeNumber", app.config['ID_BLOCK_SIZE'])
+
+def format_id(prefix, value):
+    # Legacy ids are PRM-/VEH-/OFF- plus 5 digits; the wider width keeps new ids
+    # out of that space and values past the width simply grow longer.
+    return f"{prefix}-{str(value).zfill(app.config['ID_WIDTH'])}"
 
 def generate_unique_application_id():
-    while True:
-        app_id = f"PRM-{generate_random()}"
-        if not applications_collection.find_one({"applicationId": app_id}):
-            return app_id
+    return format_id("PRM", application_ids.next())
         
 def generate_unique_vehicle_id():
-    while True:
-        VEH_ID = f"VEH-{generate_random()}"
-        if not vehicles_collection.find_one({"vehicleId": VEH_ID}):
-            return VEH_ID
+    return format_id("VEH", vehicle_ids.next())
         
 def generate_unique_badge_number():
-    while True:
-        OFF_ID = f"OFF-{generate_random()}"
-        if not officers_collection.find_one({"badgeNumber": OFF_ID}):
-            return OFF_ID
+    return format_id("OFF", badge_numbers.next())
         
+def to_object_ids(values):
+    object_ids = set()
+    for value in values:
+        try:
+            object_ids.add(ObjectId(value))
+        except (InvalidId, TypeError):
+            continue
+    return list(object_ids)
+
+def count_by_owner(collection, owner_ids, match=None):
+    if not owner_ids:
+        return {}
+
+    pipeline = [
+        {"$match": {"ownerID": {"$in": owner_ids}, **(match or {})}},
+        {"$group": {"_id": "$ownerID", "count": {"$sum": 1}}}
+    ]
+    return {group["_id"]: group["count"] for group in collection.aggregate(pipeline)}
+
+# Output key -> document fields it is built from. Handlers project only these
+# fields and ?fields=a,b narrows the response (and the projection) further.
+CLIENT_APPLICATION_FIELDS = {
+    "id": ["_id"],
+    "status": ["status"],
+    "applicationId": ["applicationId"],
+    "routeFrom": ["routeFrom"],
+    "routeTo": ["routeTo"],
+    "vehicleCount": ["vehicleCount"],
+    "submittedDate": ["submittedDate"],
+}
+ADMIN_APPLICATION_FIELDS = {
+    **CLIENT_APPLICATION_FIELDS,
+    "operatorName": ["operatorName"],
+}
+APPLICATION_SEARCH_FIELDS = {
+    "id": ["_id"],
+    "applicationId": ["applicationId"],
+    "route": ["routeFrom", "routeTo"],
+    "status": ["status"],
+    "submittedDate": ["submittedDate"],
+    "vehicleCount": ["vehicleCount"],
+    "operatorName": ["operatorName"],
+    "contactPerson": ["contactPerson"],
+    "timeline": ["timeline"],
+}
+CLIENT_VEHICLE_FIELDS = {
+    "_id": ["_id"],
+    "status": ["status"],
+    "registrationNumber": ["registrationNumber"],
+    "make": ["make"],
+    "model": ["model"],
+    "insuranceCompany": ["insuranceCompany"],
+    "driverName": ["driverName"],
+}
+ADMIN_VEHICLE_FIELDS = {
+    "operatorName": ["ownerID"],
+    "id": ["_id"],
+    "registrationNumber": ["registrationNumber"],
+    "make": ["make"],
+    "model": ["model"],
+    "status": ["status"],
+    "registrationDate": ["createdAt"],
+    "driverName": ["driverName"],
+    "capacity": ["capacity"],
+    "operatingRoute": ["operatingRoute"],
+}
+OPERATOR_FIELDS = {
+    "_id": ["_id"],
+    "firstName": ["firstName"],
+    "lastName": ["lastName"],
+    "email": ["email"],
+    "phone": ["phone"],
+    "role": ["role"],
+    "status": ["status"],
+    "businessInformation": ["businessInformation"],
+    "createdAt": ["createdAt"],
+    "updatedAt": ["updatedAt"],
+    "lastLogin": ["lastLogin"],
+    "activePermits": [],
+    "vehicles": [],
+}
+OFFICER_FIELDS = {
+    "_id": ["_id"],
+    "firstName": ["firstName"],
+    "lastName": ["lastName"],
+    "email": ["email"],
+    "badgeNumber": ["badgeNumber"],
+    "department": ["department"],
+    "phoneNumber": ["phoneNumber"],
+    "rank": ["rank"],
+    "status": ["status"],
+    "createdAt": ["createdAt"],
+    "lastLogin": ["lastLogin"],
+}
+VIOLATION_FIELDS = {
+    "_id": ["_id"],
+    "plate": ["plate", "vehicle_id"],
+    "vehicle_owner": ["vehicle_id"],
+    "officer_name": ["officer_id"],
+    "violation": ["violation"],
+    "fine": ["fine"],
+    "date": ["date"],
+    "status": ["status"],
+}
+
+def fields_projection(field_sources, keys):
+    projection = {"_id": 1}
+    for key in keys:
+        for field in field_sources[key]:
+            projection[field] = 1
+    return projection
+
+def select_fields(field_sources):
+    keys = list(field_sources)
+    requested = request.args.get("fields")
+    if requested:
+        wanted = {key.strip() for key in requested.split(",")}
+        keys = [key for key in keys if key in wanted] or keys
+    return keys, fields_projection(field_sources, keys)
+
+def pick(row, keys):
+    return {key: row[key] for key in keys if key in row}
+
+class InvalidCursor(ValueError):
+    pass
+
+def offset_pagination(page, limit, total):
+    total_pages = (total + limit - 1) // limit if total > 0 else 1
+    return {
+        "current_page": page,
+        "total_pages": total_pages,
+        "total_items": total,
+        "has_previous": page > 1,
+        "has_next": page < total_pages,
+        "previous_page": page - 1 if page > 1 else None,
+        "next_page": page + 1 if page < total_pages else None,
+    }
+
+def cursor_mode():
+    return "cursor" in request.args
+
+CURSOR_SORT_TYPES = (datetime, str, int, float)
+
+def encode_cursor(sort_value, last_id):
+    payload = json_util.dumps([sort_value, last_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, last_id = json_util.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursor(cursor)
+    if not isinstance(last_id, ObjectId):
+        raise InvalidCursor(cursor)
+    # The sort value goes into the query as is, so anything but a plain scalar
+    # (an operator document such as {"$ne": null}, a regex, an array) is refused
+    if sort_value is not None and (isinstance(sort_value, bool) or not isinstance(sort_value, CURSOR_SORT_TYPES)):
+        raise InvalidCursor(cursor)
+    return sort_value, last_id
+
+def keyset_query(query, sort_field, direction, cursor):
+    # Resume strictly after the last (sort key, _id) pair of the previous page
+    if not cursor:
+        return query
+
+    sort_value, last_id = decode_cursor(cursor)
+    operator = "$gt" if direction == 1 else "$lt"
+    after = {"$or": [
+        {sort_field: {operator: sort_value}},
+        {sort_field: sort_value, "_id": {operator: last_id}}
+    ]}
+    return {"$and": [query, after]} if query else after
+
+def cursor_pagination(documents, limit, collection, query, cursor_key):
+    has_next = len(documents) > limit
+    pagination = {
+        "mode": "cursor",
+        "limit": limit,
+        "has_next": has_next,
+        "next_cursor": encode_cursor(*cursor_key(documents[limit - 1])) if has_next else None,
+    }
+    if request.args.get("include_total") == "true":
+        pagination["total_items"] = collection.count_documents(query)
+    return pagination
+
+def cursor_page(collection, query, sort_field, direction, limit, projection=None):
+    if projection:
+        projection = {**projection, sort_field: 1}
+    documents = list(
+        collection.find(keyset_query(query, sort_field, direction, request.args.get("cursor")), projection)
+        .sort([(sort_field, direction), ("_id", direction)])
+        .limit(limit + 1)
+    )
+    pagination = cursor_pagination(documents, limit, collection, query,
+        lambda document: (document.get(sort_field), document["_id"]))
+    return documents[:limit], pagination
+
+def violations_page_pipeline(match, skip, limit, keys=None):
+    keys = keys or list(VIOLATION_FIELDS)
+    projection = {field: 1 for key in keys for field in VIOLATION_FIELDS[key]}
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"date": -1, "_id": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": {**projection, "date": 1}},
+    ]
+    if "officer_name" in keys:
+        pipeline.append({"$lookup": {
+            "from": "officers",
+            "let": {"officer_id": "$officer_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$officer_id"]}}},
+                {"$project": {"_id": 0, "firstName": 1, "lastName": 1}}
+            ],
+            "as": "officer"
+        }})
+    if "plate" in keys or "vehicle_owner" in keys:
+        pipeline.append({"$lookup": {
+            "from": "vehicles",
+            "let": {"vehicle_id": "$vehicle_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$vehicle_id"]}}},
+                {"$project": {"_id": 0, "registrationNumber": 1, "ownerID": 1}}
+            ],
+            "as": "vehicle"
+        }})
+        pipeline.append({"$unwind": {"path": "$vehicle", "preserveNullAndEmptyArrays": True}})
+    if "vehicle_owner" in keys:
+        pipeline.append({"$lookup": {
+            "from": "users",
+            "let": {"owner_id": {"$convert": {
+                "input": "$vehicle.ownerID", "to": "objectId", "onError": None, "onNull": None
+            }}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$owner_id"]}}},
+                {"$project": {"_id": 0, "firstName": 1, "lastName": 1}}
+            ],
+            "as": "owner"
+        }})
+    return pipeline
+
+def fetch_violations_page(match, skip, limit, keys=None):
+    keys = keys or list(VIOLATION_FIELDS)
+    violations = []
+    for v in violations_collection.aggregate(violations_page_pipeline(match, skip, limit, keys)):
+        officer = v["officer"][0] if v.get("officer") else None
+        vehicle = v.get("vehicle") or {}
+        owner = v["owner"][0] if v.get("owner") else None
+
+        if not isinstance(v.get("vehicle_id"), ObjectId):
+            vehicle_owner = "Not registered"
+        elif owner:
+            vehicle_owner = f"{owner.get('firstName', '')} {owner.get('lastName', '')}".strip()
+        else:
+            vehicle_owner = ""
+
+        violations.append(pick({
+            "_id": str(v["_id"]),
+            "plate" : v.get("plate") or vehicle.get("registrationNumber", ""),
+            "vehicle_owner": vehicle_owner,
+            "officer_name": f"{officer.get('firstName', '')} {officer.get('lastName', '')}" if officer else "N/A",
+            "violation": v.get("violation"),
+            "fine": v.get("fine"),
+            "date": v.get("date"),
+            "status": v.get("status", "unpaid")
+        }, keys))
+    return violations
+
+# Plate cards hold the exact /api/officer/search payload per normalized plate,
+# so the roadside lookup is a single point read on _id.
+def normalize_plate(plate):
+    return "".join(ch for ch in str(plate).upper() if ch.isalnum())
+
+# Characters officers and cameras commonly confuse fold onto one symbol
+PLATE_CONFUSABLES = str.maketrans({"O": "0", "Q": "0", "I": "1", "L": "1", "S": "5", "B": "8", "Z": "2"})
+
+def plate_key(plate):
+    return normalize_plate(plate).translate(PLATE_CONFUSABLES)
+
+def plate_variants(key):
+    # The key plus every single-character deletion of it. Two keys one edit
+    # apart always share a variant (most two-edit pairs do too), so a multikey
+    # index on these answers fuzzy lookups with one bounded $in.
+    return sorted({key} | {key[:i] + key[i + 1:] for i in range(len(key))})
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def suggest_plates(plate, limit=5, candidate_limit=50):
+    normalized, key = normalize_plate(plate), plate_key(plate)
+    if not key:
+        return []
+
+    suggestions = []
+    candidates = plate_cards_collection.find(
+        {"plateVariants": {"$in": plate_variants(key)}},
+        {"plateKey": 1, "payload.licensePlate": 1, "payload.vehicleID": 1}
+    ).limit(candidate_limit)
+    for card in candidates:
+        key_distance = edit_distance(key, card["plateKey"])
+        if key_distance > 2:
+            continue
+        # Differences that only exist before folding (O vs 0) cost a quarter of a real edit
+        raw_distance = edit_distance(normalized, card["_id"])
+        penalty = key_distance + 0.25 * max(0, raw_distance - key_distance)
+        suggestions.append({
+            "licensePlate": card["payload"]["licensePlate"],
+            "vehicleID": card["payload"]["vehicleID"],
+            "confidence": round(max(0.0, 1 - penalty / max(len(key), len(card["plateKey"]))), 2)
+        })
+
+    suggestions.sort(key=lambda suggestion: suggestion["confidence"], reverse=True)
+    return suggestions[:limit]
+
+def plate_not_found_payload(plate):
+    return {
+        "licensePlate": plate,
+        "status": "not_found",
+        "operatorName": "Not Found",
+        "contactPerson": "N/A",
+        "vehicleModel": "N/A",
+        "capacity": 0,
+        "route": "N/A",
+        "permitNumber": "N/A",
+        "phone": "N/A",
+        "permitExpiry": "N/A",
+        "lastInspection": "N/A",
+        "insuranceExpiry": "N/A",
+        "roadworthyExpiry": "N/A",
+        "violations": []
+    }
+
+# Vehicles carry a violationSummary kept current with $inc as violations are
+# recorded and paid. Fines are free-text strings, so sums are kept in cents.
+FINE_AMOUNT = re.compile(r"\d+(?:\.\d+)?")
+
+def fine_cents(fine):
+    match = FINE_AMOUNT.search(str(fine or "").replace(",", ""))
+    return int(round(float(match.group()) * 100)) if match else 0
+
+def violation_summary(vehicle):
+    summary = vehicle.get("violationSummary") or {}
+    return {
+        "total": summary.get("total", 0),
+        "unpaid": summary.get("unpaid", 0),
+        "unpaidFines": round(summary.get("unpaidFineCents", 0) / 100, 2),
+        "lastViolationDate": summary.get("lastViolationDate")
+    }
+
+def recent_violations(vehicle_ids, limit=None):
+    limit = limit or app.config['RECENT_VIOLATIONS_LIMIT']
+    projection = {"vehicle_id": 1, "officer_id": 1, "violation": 1, "fine": 1, "date": 1, "status": 1}
+
+    def latest(vehicle_id):
+        # Reads the head of vehicle_id_date_id, so cost stays flat however long the history
+        return list(
+            violations_collection.find({"vehicle_id": vehicle_id}, projection)
+            .sort([("date", -1), ("_id", -1)])
+            .limit(limit)
+        )
+
+    # Oldest first, matching the order officers have always seen
+    return {
+        vehicle_id: violations[::-1]
+        for vehicle_id, violations in zip(vehicle_ids, query_executor.map(latest, vehicle_ids))
+        if violations
+    }
+
+def build_plate_card(vehicle, operator, violations):
+    operator = operator or {}
+    key = plate_key(vehicle["registrationNumber"])
+    return {
+        "_id": normalize_plate(vehicle["registrationNumber"]),
+        "vehicle_id": vehicle["_id"],
+        "ownerID": vehicle.get("ownerID"),
+        "plateKey": key,
+        "plateVariants": plate_variants(key),
+        "payload": {
+            "vehicleID": str(vehicle["_id"]),
+            "licensePlate": vehicle["registrationNumber"],
+            "status": vehicle.get("status", "unknown"),
+            "operatorName": f"{operator.get('firstName', '')} {operator.get('lastName', '')}".strip() or "N/A",
+            "contactPerson": vehicle.get("driverName", "N/A"),
+            "vehicleModel": f"{vehicle.get('make', '')} {vehicle.get('model', '')}".strip(),
+            "capacity": vehicle.get("capacity", 0),
+            "phone": operator.get("businessInformation", {}).get("contactPerson", "N/A"),
+            "route": vehicle.get("operatingRoute", "N/A"),
+            "permitNumber": vehicle.get("vehicleId", "N/A"),
+            "permitExpiry": vehicle.get("driverLicenseExpiry", "N/A"),
+            "lastInspection": vehicle.get("registrationDate", "N/A"),
+            "insuranceExpiry": vehicle.get("insuranceExpiryDate", "N/A"),
+            "roadworthyExpiry": vehicle.get("roadworthyExpiryDate", "N/A"),
+            "violations": [
+                {
+                    "id": str(v["_id"]),
+                    "officer_id": str(v.get("officer_id")),
+                    "violation": v.get("violation"),
+                    "fine": v.get("fine"),
+                    "date": v.get("date"),
+                    "status": v.get("status", "unpaid")
+                }
+                for v in violations
+            ],
+            "violationSummary": violation_summary(vehicle)
+        }
+    }
+
+def build_plate_cards(vehicle_query):
+    vehicles = list(vehicles_collection.find(vehicle_query))
+    if not vehicles:
+        return []
+
+    owners = {
+        str(owner["_id"]): owner
+        for owner in users_collection.find(
+            {"_id": {"$in": to_object_ids(vehicle.get("ownerID") for vehicle in vehicles)}},
+            {"firstName": 1, "lastName": 1, "businessInformation.contactPerson": 1}
+        )
+    }
+    violations_by_vehicle = recent_violations([vehicle["_id"] for vehicle in vehicles])
+
+    return [
+        build_plate_card(vehicle, owners.get(str(vehicle.get("ownerID"))), violations_by_vehicle.get(vehicle["_id"], []))
+        for vehicle in vehicles
+    ]
+
+def refresh_plate_cards(vehicle_query):
+    # A card is only replaced for the vehicle that owns it. Vehicles registered
+    # before normalizedPlate was enforced can share a normalized plate; the
+    # later one is logged and left uncarded rather than overwriting the first.
+    cards = build_plate_cards(vehicle_query)
+    if cards:
+        now = datetime.now(cat_tz)
+        try:
+            plate_cards_collection.bulk_write(
+                [ReplaceOne({"_id": card["_id"], "vehicle_id": card["vehicle_id"]}, {**card, "updatedAt": now}, upsert=True)
+                 for card in cards],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            collided = {error["index"] for error in e.details["writeErrors"] if error["code"] == 11000}
+            if len(collided) < len(e.details["writeErrors"]):
+                raise
+            for index in sorted(collided):
+                app.logger.error(f"Plate {cards[index]['_id']} is already carded for another vehicle; "
+                                 f"vehicle {cards[index]['vehicle_id']} needs its registration corrected")
+            cards = [card for index, card in enumerate(cards) if index not in collided]
+    return cards
+
+def sync_plate_cards(vehicle_query=None, drop=None):
+    # Card maintenance runs after the primary write has succeeded; a failure is
+    # logged and left for `flask plate-cards check` instead of failing the request.
+    try:
+        if drop:
+            plate_cards_collection.delete_many(drop)
+        if vehicle_query:
+            refresh_plate_cards(vehicle_query)
+    except PyMongoError as e:
+        app.logger.error(f"Plate card sync failed for {vehicle_query or drop}: {e}")
+
+class RegisteredPlates:
+    # In-process set of every registered normalized plate so lookups for
+    # unregistered plates never reach MongoDB. A background thread in each
+    # process reads the registeredPlates counter, which every registration
+    # bumps after its insert, every poll_interval seconds and rescans from the
+    # createdAt watermark whenever it moved; the scan also runs every
+    # refresh_interval seconds as a backstop. A plate registered through
+    # another process can read as unregistered for up to poll_interval, and a
+    # plate deleted elsewhere only costs a wasted point read until the next
+    # restart.
+    def __init__(self, refresh_interval, poll_interval, overlap=timedelta(minutes=1)):
+        self.refresh_interval = refresh_interval
+        self.poll_interval = poll_interval
+        self.overlap = overlap
+        self._plates = set()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._watermark = None
+        self._marker = None
+        self._next_refresh = 0
+        self._poller_pid = None
+
+    def refresh(self):
+        with self._refresh_lock:
+            # Read before the scan, so a registration that lands during it moves the marker again
+            counter = counters_collection.find_one({"_id": "registeredPlates"})
+            marker = counter["value"] if counter else 0
+            if marker == self._marker and time.monotonic() < self._next_refresh:
+                return
+
+            started = datetime.now(cat_tz)
+            query = {"createdAt": {"$gte": self._watermark}} if self._watermark else {}
+            plates = {
+                normalize_plate(vehicle.get("registrationNumber", ""))
+                for vehicle in vehicles_collection.find(query, {"_id": 0, "registrationNumber": 1})
+            }
+            with self._lock:
+                self._plates |= plates
+
+            # Overlap the next scan to tolerate clock skew between API nodes
+            self._watermark = started - self.overlap
+            self._marker = marker
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def poll(self):
+        while True:
+            try:
+                self.refresh()
+            except PyMongoError as e:
+                app.logger.error(f"Registered plate refresh failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def start(self):
+        # One poller per serving process, started again in each forked worker
+        if self._poller_pid == os.getpid():
+            return
+        with self._lock:
+            if self._poller_pid != os.getpid():
+                threading.Thread(target=self.poll, name="plates-poller", daemon=True).start()
+                self._poller_pid = os.getpid()
+
+    def existing(self, plates):
+        self.start()
+        if self._marker is None:
+            # Only the first lookup in a process waits for the initial scan
+            self.refresh()
+        with self._lock:
+            return [plate for plate in plates if plate in self._plates]
+
+    def add(self, plate):
+        with self._lock:
+            self._plates.add(normalize_plate(plate))
+        counters_collection.update_one({"_id": "registeredPlates"}, {"$inc": {"value": 1}}, upsert=True)
+
+    def discard(self, plate):
+        with self._lock:
+            self._plates.discard(normalize_plate(plate))
+
+registered_plates = RegisteredPlates(app.config['PLATE_FILTER_REFRESH'], app.config['PLATE_FILTER_POLL'])
+
+def find_plate_cards(plates):
+    # Maps each normalized plate to its card payload; plates that are not
+    # registered are absent from the result.
+    candidates = {normalize_plate(plate): plate.upper() for plate in plates}
+    candidates = {key: candidates[key] for key in registered_plates.existing(list(candidates))}
+    if not candidates:
+        return {}
+
+    payloads = {
+        card["_id"]: card["payload"]
+        for card in plate_cards_collection.find({"_id": {"$in": list(candidates)}}, {"payload": 1})
+    }
+    uncarded = [plate for key, plate in candidates.items() if key not in payloads]
+    if uncarded:
+        # Vehicles without a card yet (e.g. before the first rebuild) are carded on first lookup
+        for card in refresh_plate_cards({"$or": [
+            {"registrationNumber": {"$in": uncarded}},
+            {"plateKey": {"$in": [plate_key(plate) for plate in uncarded]}}
+        ]}):
+            if card["_id"] in candidates:
+                payloads[card["_id"]] = card["payload"]
+    return payloads
+
+def iter_vehicle_id_batches(batch_size=500):
+    batch = []
+    for vehicle in vehicles_collection.find({}, {"_id": 1}):
+        batch.append(vehicle["_id"])
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+@app.cli.group("plate-cards")
+def plate_cards_cli():
+    """Maintain the officer plate card read model."""
+
+@plate_cards_cli.command("rebuild")
+def rebuild_plate_cards_command():
+    rebuilt = 0
+    for vehicle_ids in iter_vehicle_id_batches():
+        cards = refresh_plate_cards({"_id": {"$in": vehicle_ids}})
+        if cards:
+            # Backfill the lookup keys on vehicles registered before they existed
+            vehicles_collection.bulk_write(
+                [UpdateOne({"_id": card["vehicle_id"]}, {"$set": {"plateKey": card["plateKey"], "normalizedPlate": card["_id"]}})
+                 for card in cards],
+                ordered=False
+            )
+        rebuilt += len(cards)
+
+    live_ids = vehicles_collection.distinct("_id")
+    orphans = plate_cards_collection.delete_many({"vehicle_id": {"$nin": live_ids}}).deleted_count
+    print(f"Rebuilt {rebuilt} plate cards, removed {orphans} orphaned cards")
+
+@plate_cards_cli.command("check")
+def check_plate_cards_command():
+    missing, stale, checked = [], [], 0
+    for vehicle_ids in iter_vehicle_id_batches():
+        expected = build_plate_cards({"_id": {"$in": vehicle_ids}})
+        stored = {
+            card["_id"]: card
+            for card in plate_cards_collection.find({"_id": {"$in": [card["_id"] for card in expected]}})
+        }
+        for card in expected:
+            checked += 1
+            current = stored.get(card["_id"])
+            if not current:
+                missing.append(card["_id"])
+            elif any(current.get(field) != card[field] for field in ("payload", "vehicle_id", "plateKey", "plateVariants")):
+                stale.append(card["_id"])
+
+    live_ids = vehicles_collection.distinct("_id")
+    orphans = [card["_id"] for card in plate_cards_collection.find({"vehicle_id": {"$nin": live_ids}}, {"_id": 1})]
+
+    print(f"Checked {checked} vehicles: {len(missing)} missing, {len(stale)} stale, {len(orphans)} orphaned cards")
+    for label, plates in (("missing", missing), ("stale", stale), ("orphaned", orphans)):
+        for plate in plates:
+            print(f"  {label}: {plate}")
+
+@app.cli.group("violations")
+def violations_cli():
+    """Maintain the per-vehicle violation summaries."""
+
+@violations_cli.command("rebuild-summaries")
+def rebuild_violation_summaries_command():
+    # Recomputes every summary from the violations themselves; run before
+    # plate-cards rebuild when backfilling vehicles that predate summaries
+    summaries = {}
+    for violation in violations_collection.find({}, {"vehicle_id": 1, "fine": 1, "date": 1, "status": 1}):
+        summary = summaries.setdefault(violation.get("vehicle_id"), {
+            "total": 0, "unpaid": 0, "unpaidFineCents": 0, "lastViolationDate": None
+        })
+        summary["total"] += 1
+        if violation.get("status") != "paid":
+            summary["unpaid"] += 1
+            summary["unpaidFineCents"] += fine_cents(violation.get("fine"))
+        if violation.get("date") and (summary["lastViolationDate"] is None or violation["date"] > summary["lastViolationDate"]):
+            summary["lastViolationDate"] = violation["date"]
+
+    updated = 0
+    for vehicle_ids in iter_vehicle_id_batches():
+        empty = {"total": 0, "unpaid": 0, "unpaidFineCents": 0, "lastViolationDate": None}
+        vehicles_collection.bulk_write([
+            UpdateOne({"_id": vehicle_id}, {"$set": {"violationSummary": summaries.get(vehicle_id, empty)}})
+            for vehicle_id in vehicle_ids
+        ], ordered=False)
+        updated += len(vehicle_ids)
+    print(f"Rebuilt violation summaries for {updated} vehicles")
+
+# Every change an officer device caches (vehicle fields, deletion, violation
+# counts) stamps the vehicle with a new global version for the sync feed, and
+# versionedAt records when it was allocated.
+SYNC_COLUMNS = ["plate", "registrationNumber", "status", "insuranceExpiry", "roadworthyExpiry", "permitExpiry", "outstandingViolations"]
+
+def next_vehicle_versions(count=1):
+    counter = counters_collection.find_one_and_update(
+        {"_id": "vehicleVersion"},
+        {"$inc": {"value": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return list(range(counter["value"] - count + 1, counter["value"] + 1))
+
+def stamp_vehicle_versions(vehicle_ids):
+    vehicle_ids = [vehicle_id for vehicle_id in vehicle_ids if isinstance(vehicle_id, ObjectId)]
+    if not vehicle_ids:
+        return
+    versions = next_vehicle_versions(len(vehicle_ids))
+    versioned_at = datetime.now(cat_tz)
+    vehicles_collection.bulk_write([
+        UpdateOne({"_id": vehicle_id}, {"$set": {"version": version, "versionedAt": versioned_at}})
+        for vehicle_id, version in zip(vehicle_ids, versions)
+    ], ordered=False)
+
+def record_vehicle_tombstones(vehicles):
+    vehicles = list(vehicles)
+    if not vehicles:
+        return
+    versions = next_vehicle_versions(len(vehicles))
+    now = datetime.now(cat_tz)
+    vehicle_tombstones_collection.insert_many([
+        {
+            "vehicle_id": vehicle["_id"],
+            "plate": normalize_plate(vehicle.get("registrationNumber", "")),
+            "version": version,
+            "versionedAt": now,
+            "deletedAt": now
+        }
+        for vehicle, version in zip(vehicles, versions)
+    ])
+
+def latest_vehicle_version(settled_before=None):
+    # Versions are allocated before their write lands, so a version is only
+    # safe to hand out as a watermark once everything allocated before it has
+    # had time to land; documents from before versionedAt count as settled
+    query = {"version": {"$exists": True}}
+    if settled_before is not None:
+        query["$or"] = [{"versionedAt": {"$lte": settled_before}}, {"versionedAt": {"$exists": False}}]
+    latest = 0
+    for collection in (vehicles_collection, vehicle_tombstones_collection):
+        document = collection.find_one(query, {"_id": 0, "version": 1}, sort=[("version", -1)])
+        if document:
+            latest = max(latest, document["version"])
+    return latest
+
+def sync_rows(vehicle_query, full):
+    vehicles = list(vehicles_collection.find(vehicle_query, {
+        "registrationNumber": 1, "status": 1, "insuranceExpiryDate": 1,
+        "roadworthyExpiryDate": 1, "driverLicenseExpiry": 1, "version": 1, "violationSummary.unpaid": 1
+    }))
+    return [
+        [
+            normalize_plate(vehicle.get("registrationNumber", "")),
+            vehicle.get("registrationNumber"),
+            vehicle.get("status"),
+            vehicle.get("insuranceExpiryDate"),
+            vehicle.get("roadworthyExpiryDate"),
+            vehicle.get("driverLicenseExpiry"),
+            vehicle.get("violationSummary", {}).get("unpaid", 0),
+        ]
+        for vehicle in vehicles
+    ]
+
+# Approved vehicles carry an Ed25519-signed permit token that officer devices
+# verify offline against the public key; revocations are synced separately.
+PERMIT_TOKEN_PREFIX = "HPM1"
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+class PermitSigningUnavailable(Exception):
+    pass
+
+def load_permit_signing_key():
+    # The key comes only from deployment: PERMIT_SIGNING_KEY or the file at
+    # PERMIT_KEY_PATH. It is never generated or stored by the app, since anyone
+    # holding it can mint permits that officer devices accept offline.
+    if Ed25519PrivateKey is None:
+        raise PermitSigningUnavailable("cryptography is not installed")
+    if app.config['PERMIT_SIGNING_KEY']:
+        padded = app.config['PERMIT_SIGNING_KEY'] + "=" * (-len(app.config['PERMIT_SIGNING_KEY']) % 4)
+        return Ed25519PrivateKey.from_private_bytes(base64.urlsafe_b64decode(padded))
+
+    key_path = app.config['PERMIT_KEY_PATH']
+    if os.path.exists(key_path):
+        with open(key_path, "rb") as key_file:
+            return Ed25519PrivateKey.from_private_bytes(key_file.read())
+    raise PermitSigningUnavailable("no signing key configured; set PERMIT_SIGNING_KEY or PERMIT_KEY_PATH")
+
+_permit_key = None
+_permit_key_lock = threading.Lock()
+
+def permit_signing_key():
+    global _permit_key
+    with _permit_key_lock:
+        if _permit_key is None:
+            _permit_key = load_permit_signing_key()
+        return _permit_key
+
+def permit_public_key_bytes():
+    return permit_signing_key().public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+def permit_key_id():
+    return hashlib.sha256(permit_public_key_bytes()).hexdigest()[:8]
+
+def permit_claims(vehicle):
+    return {
+        "vid": vehicle.get("vehicleId"),
+        "plate": vehicle.get("registrationNumber"),
+        "route": vehicle.get("operatingRoute"),
+        "ins": vehicle.get("insuranceExpiryDate"),
+        "rw": vehicle.get("roadworthyExpiryDate"),
+        "dl": vehicle.get("driverLicenseExpiry"),
+    }
+
+def issue_permit(vehicle):
+    claims = permit_claims(vehicle)
+    now = datetime.now(cat_tz)
+    payload = {**claims, "jti": str(ObjectId()), "iat": int(now.timestamp()), "kid": permit_key_id()}
+    signing_input = f"{PERMIT_TOKEN_PREFIX}.{b64url(json.dumps(payload, separators=(',', ':')).encode('utf-8'))}"
+    signature = permit_signing_key().sign(signing_input.encode("ascii"))
+    return {
+        "jti": payload["jti"],
+        "token": f"{signing_input}.{b64url(signature)}",
+        "claims": claims,
+        "issuedAt": now
+    }
+
+def reconcile_permit(vehicle, update_data):
+    # Returns the fields to $set and the permit being replaced, which the caller
+    # revokes once the update has been written.
+    current = vehicle.get("permit")
+    updated = {**vehicle, **update_data}
+
+    if updated.get("status") != "approved":
+        return ({"permit": None}, current) if current else ({}, None)
+
+    if current and current.get("claims") == permit_claims(updated):
+        return {}, None
+
+    try:
+        return {"permit": issue_permit(updated)}, current
+    except PermitSigningUnavailable as e:
+        # The permit route issues one on first request once signing is available
+        app.logger.error(f"Vehicle {updated.get('vehicleId')} approved without a permit: {e}")
+        return {"permit": None}, current
+
+def revoke_permits(permits, reason):
+    permits = [permit for permit in permits if permit and permit.get("jti")]
+    if not permits:
+        return
+    now = datetime.now(cat_tz)
+    counter = counters_collection.find_one_and_update(
+        {"_id": "permitRevocation"},
+        {"$inc": {"value": len(permits)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    first_seq = counter["value"] - len(permits) + 1
+    permit_revocations_collection.insert_many([
+        {
+            "jti": permit["jti"],
+            "vid": permit.get("claims", {}).get("vid"),
+            "reason": reason,
+            "revokedAt": now,
+            "seq": seq
+        }
+        for seq, permit in enumerate(permits, first_seq)
+    ])
+
+def build_violation(officer, vehicle_id, data):
+    try:
+        V_ID = ObjectId(vehicle_id)
+    except (InvalidId, TypeError):
+        V_ID = vehicle_id
+
+    today = datetime.now(cat_tz).strftime("%Y-%m-%d")
+    violation = {
+        "_id": ObjectId(),
+        "vehicle_id": V_ID,
+        "officer_id": ObjectId(officer.get("_id")),
+        "violation": data.get("violation"),
+        "fine": data.get("fine"),
+        "plate" : data.get("plate", ""),
+        "date": today,
+        "status": "unpaid",
+    }
+
+    if data.get("idempotencyKey"):
+        violation["idempotencyKey"] = str(data["idempotencyKey"])
+        # Queued offline violations keep the day they were written, never a future one
+        try:
+            recorded = datetime.strptime(str(data.get("date")), "%Y-%m-%d").strftime("%Y-%m-%d")
+            violation["date"] = min(recorded, today)
+        except ValueError:
+            pass
+    return violation
+
+def serialize_violation(violation):
+    violation = dict(violation)
+    violation["id"] = violation.pop("_id")
+    return violation
+
+def on_violations_recorded(violations):
+    totals = {}
+    for violation in violations:
+        if not isinstance(violation["vehicle_id"], ObjectId):
+            continue
+        total = totals.setdefault(violation["vehicle_id"], {"count": 0, "cents": 0, "last": violation["date"]})
+        total["count"] += 1
+        total["cents"] += fine_cents(violation.get("fine"))
+        total["last"] = max(total["last"], violation["date"])
+    if not totals:
+        return
+
+    versions = next_vehicle_versions(len(totals))
+    versioned_at = datetime.now(cat_tz)
+    vehicles_collection.bulk_write([
+        UpdateOne({"_id": vehicle_id}, {
+            "$inc": {
+                "violationSummary.total": total["count"],
+                "violationSummary.unpaid": total["count"],
+                "violationSummary.unpaidFineCents": total["cents"]
+            },
+            "$max": {"violationSummary.lastViolationDate": total["last"]},
+            "$set": {"version": version, "versionedAt": versioned_at}
+        })
+        for (vehicle_id, total), version in zip(totals.items(), versions)
+    ], ordered=False)
+    sync_plate_cards({"_id": {"$in": list(totals)}})
+
+def on_violation_paid(violation):
+    vehicle_id = violation.get("vehicle_id")
+    if not isinstance(vehicle_id, ObjectId):
+        return
+    # Vehicles whose summary predates this violation are left for rebuild-summaries
+    result = vehicles_collection.update_one(
+        {"_id": vehicle_id, "violationSummary.unpaid": {"$gt": 0}},
+        {
+            "$inc": {
+                "violationSummary.unpaid": -1,
+                "violationSummary.unpaidFineCents": -fine_cents(violation.get("fine"))
+            },
+            "$set": {"version": next_vehicle_versions()[0], "versionedAt": datetime.now(cat_tz)}
+        }
+    )
+    if result.matched_count == 0:
+        stamp_vehicle_versions([vehicle_id])
+    sync_plate_cards({"_id": vehicle_id})
+
 """
 #### CLIENT ROUTES  ####
 """
@@ -184,19 +2370,9 @@ def generate_unique_badge_number():
 def get_client_dashboard(current_user):
     try:
         id = str(current_user.get("_id"))
-        totalApplications = applications_collection.count_documents({"ownerID" : id})
-        activePermits = applications_collection.count_documents({"ownerID" : id, "status" : "active"})
-        registeredVehicles = vehicles_collection.count_documents({"ownerID" : id, "status" : "approved"})
-        pendingReviews = applications_collection.count_documents({"ownerID" : id , "status" : "pending"})
-
         return{
             "success" : True,
-            "stats" : {
-                "totalApplications" : totalApplications,
-                "activePermits" : activePermits,
-                "registeredVehicles" : registeredVehicles,
-                "pendingReviews" : pendingReviews
-            }
+            "stats" : client_dashboard_stats(id)
         }, 200
     
     except Exception as e:
@@ -211,25 +2387,36 @@ def get_client_dashboard(current_user):
 def get_client_applications(current_user):
     try:
         id = str(current_user["_id"])
+        etag = application_list_etag(id)
+        cached = cached_response(etag)
+        if cached:
+            return cached
+
         page = max(1, int(request.args.get('page', 1)))  
         limit = 5      
         skip = (page - 1) * limit
+        keys, projection = select_fields(CLIENT_APPLICATION_FIELDS)
         
-        total = applications_collection.count_documents({"ownerID": str(id)})
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
-        
-        if page > total_pages and total > 0:
-            return {
-                "success": False,
-                "message": f"Page {page} not found. Maximum page is {total_pages}"
-            }, 404
-        
-        applications = list(
-            applications_collection.find({"ownerID": str(id)})
-            .skip(skip)
-            .limit(limit)
-            .sort('createdAt', 1)
-        )
+        if cursor_mode():
+            applications, pagination = cursor_page(applications_collection, {"ownerID": str(id)}, 'createdAt', 1, limit, projection)
+        else:
+            page_results = fan_out(
+                total=lambda: applications_collection.count_documents({"ownerID": str(id)}),
+                applications=lambda: list(
+                    applications_collection.find({"ownerID": str(id)}, projection)
+                    .skip(skip)
+                    .limit(limit)
+                    .sort('createdAt', 1)
+                )
+            )
+            total, applications = page_results["total"], page_results["applications"]
+            pagination = offset_pagination(page, limit, total)
+            
+            if page > pagination["total_pages"] and total > 0:
+                return {
+                    "success": False,
+                    "message": f"Page {page} not found. Maximum page is {pagination['total_pages']}"
+                }, 404
         trimmedApplications = []
 
         for application in applications:
@@ -242,24 +2429,16 @@ def get_client_applications(current_user):
                 "vehicleCount": application.get("vehicleCount"),
                 "submittedDate": application.get("submittedDate"),
             }
-            trimmedApplications.append(trimmedApplication)
-
-        pagination = {
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "has_previous": page > 1,
-            "has_next": page < total_pages,
-            "previous_page": page - 1 if page > 1 else None,
-            "next_page": page + 1 if page < total_pages else None,
-        }
+            trimmedApplications.append(pick(trimmedApplication, keys))
         
-        return {
+        return versioned_response(etag, {
             "success": True,
             "results": trimmedApplications,
             "pagination": pagination
-        }, 200
+        })
     
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
     except Exception as e:
         return {'error': str(e)}, 500
 
@@ -278,11 +2457,15 @@ def create_application(current_user):
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
         saved_files = {}
-        for key in ['businessRegistrationCertificate', 'vehicleDocuments', 'insuranceCertificates', 'driversLicenses']:
-            file = files.get(key)
-            if file:
-                file_path = save_file(file)
-                saved_files[key] = "NULL" if not file_path else file_path
+        try:
+            for key in ['businessRegistrationCertificate', 'vehicleDocuments', 'insuranceCertificates', 'driversLicenses']:
+                file = files.get(key)
+                if file:
+                    file_path = save_file(file)
+                    saved_files[key] = "NULL" if not file_path else file_path
+        except BlobStoreBusy:
+            release_files(saved_files.values())
+            return blob_store_busy_response()
 
         
         application_id = generate_unique_application_id()
@@ -297,6 +2480,7 @@ def create_application(current_user):
             'createdAt': now,
             'updatedAt': now,
             'uploadedFiles': saved_files,
+            'version': 1,
             'timeline': [
                 {
                     'status': 'submitted',
@@ -309,6 +2493,8 @@ def create_application(current_user):
         }
 
         applications_collection.insert_one(application)
+        bump_application_lists([application["ownerID"]])
+        enqueue_media(saved_files.values())
 
         return jsonify({
             'success': True,
@@ -323,13 +2509,21 @@ def create_application(current_user):
 @app.route('/api/applications/<application_id>', methods=['GET'])
 def get_application(application_id):
     try:
+        if request.if_none_match:
+            # Covered by applicationId_version when it exists; no hint, so a missing index only costs a fetch
+            probe = next(applications_collection.find(
+                {'applicationId': application_id}, {'_id': 0, 'applicationId': 1, 'version': 1}
+            ).limit(1), None)
+            if probe:
+                cached = cached_response(f"application:{application_id}:{probe.get('version', 0)}")
+                if cached:
+                    return cached
+
         application = applications_collection.find_one({'applicationId': application_id})   
         if not application:
             return jsonify({'error': 'Application not found'}), 404
-        serialized_app = serialize_application(application)
-        
         app.logger.info(f"Application fetched successfully: {application_id}")
-        return jsonify(serialized_app), 200
+        return versioned_response(f"application:{application_id}:{application.get('version', 0)}", application)
     
     except Exception as e:
         app.logger.error(f"Error fetching application {application_id}: {str(e)}")
@@ -348,6 +2542,7 @@ def search_application(current_user):
             "message" :"Empty query"
         }
     try:
+        keys, projection = select_fields(APPLICATION_SEARCH_FIELDS)
         if mode == "default":
             applications = list(applications_collection.find({
                 "ownerID": id,
@@ -355,7 +2550,7 @@ def search_application(current_user):
                     "$regex": f"{query}",
                     "$options": "i"
                 }
-            }).limit(5))
+            }, projection).limit(5))
 
             trimmedApplications = []
             for application in applications:
@@ -371,7 +2566,7 @@ def search_application(current_user):
                     "timeline": application.get("timeline") 
                 }
 
-                trimmedApplications.append(trimmedApplication)
+                trimmedApplications.append(pick(trimmedApplication, keys))
 
             return {
                 "success" : True,
@@ -385,11 +2580,11 @@ def search_application(current_user):
                     "$regex": f"^{query}$",
                     "$options": "i"
                 }
-            })
+            }, projection)
 
             return {
                 "success" : True,
-                "result" :  {
+                "result" :  pick({
                     "id" : str(application.get("_id")),
                     "applicationId" : application.get("applicationId"),
                     "route" : f"{application.get("routeFrom")} - {application.get("routeTo")}",
@@ -399,7 +2594,7 @@ def search_application(current_user):
                     "operatorName": application.get("operatorName"),
                     "contactPerson": application.get("contactPerson"),
                     "timeline": application.get("timeline") 
-                }
+                }, keys)
             }, 200
 
 
@@ -415,45 +2610,41 @@ def get_client_vehicles(current_user):
         page = max(1, int(request.args.get('page', 1)))  
         limit = min(50, max(1, int(request.args.get('limit', 10))))       
         skip = (page - 1) * limit
+        keys, projection = select_fields(CLIENT_VEHICLE_FIELDS)
         
-        total = vehicles_collection.count_documents({"ownerID": str(id)})
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
-        
-        if page > total_pages and total > 0:
-            return {
-                "success": False,
-                "message": f"Page {page} not found. Maximum page is {total_pages}"
-            }, 404
-        
-        vehicles = list(
-            vehicles_collection.find({"ownerID": str(id)})
-            .skip(skip)
-            .limit(limit)
-            .sort('registrationNumber', 1)
-        )
+        if cursor_mode():
+            vehicles, pagination = cursor_page(vehicles_collection, {"ownerID": str(id)}, 'registrationNumber', 1, limit, projection)
+        else:
+            page_results = fan_out(
+                total=lambda: vehicles_collection.count_documents({"ownerID": str(id)}),
+                vehicles=lambda: list(
+                    vehicles_collection.find({"ownerID": str(id)}, projection)
+                    .skip(skip)
+                    .limit(limit)
+                    .sort('registrationNumber', 1)
+                )
+            )
+            total, vehicles = page_results["total"], page_results["vehicles"]
+            pagination = offset_pagination(page, limit, total)
+            
+            if page > pagination["total_pages"] and total > 0:
+                return {
+                    "success": False,
+                    "message": f"Page {page} not found. Maximum page is {pagination['total_pages']}"
+                }, 404
         
         trimmed_vehicles = []
         for vehicle in vehicles:
             trimmed_vehicle = {
                 "_id": str(vehicle['_id']), 
                 "status" : vehicle.get("status"),
-                "registrationNumber": vehicle["registrationNumber"],
-                "make": vehicle["make"],
-                "model": vehicle["model"],
-                "insuranceCompany": vehicle["insuranceCompany"],
+                "registrationNumber": vehicle.get("registrationNumber"),
+                "make": vehicle.get("make"),
+                "model": vehicle.get("model"),
+                "insuranceCompany": vehicle.get("insuranceCompany"),
                 "driverName": vehicle.get("driverName")
             }
-            trimmed_vehicles.append(trimmed_vehicle)
-        
-        pagination = {
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "has_previous": page > 1,
-            "has_next": page < total_pages,
-            "previous_page": page - 1 if page > 1 else None,
-            "next_page": page + 1 if page < total_pages else None,
-        }
+            trimmed_vehicles.append(pick(trimmed_vehicle, keys))
         
         return {
             "success": True,
@@ -461,6 +2652,9 @@ def get_client_vehicles(current_user):
             "pagination": pagination
         }, 200
     
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
+    
     except ValueError:
         return {
             "success": False,
@@ -499,6 +2693,41 @@ def get_client_information(current_user):
             "message": "An internal error occurred"
         }, 500  
 
+@app.route("/api/vehicles/<vehicle_id>/permit", methods=["GET"])
+@token_required
+def get_vehicle_permit(current_user, vehicle_id):
+    try:
+        query = {"_id": ObjectId(vehicle_id)}
+    except InvalidId:
+        return {"success": False, "message": "Invalid vehicle ID"}, 400
+
+    if current_user.get("role") != "admin":
+        query["ownerID"] = str(current_user["_id"])
+
+    vehicle = vehicles_collection.find_one(query)
+    if not vehicle:
+        return {"success": False, "message": "Vehicle not found"}, 404
+
+    if vehicle.get("status") != "approved":
+        return {"success": False, "message": "Vehicle is not approved"}, 409
+
+    permit = vehicle.get("permit")
+    if not permit:
+        # Vehicles approved before permits were issued get one on first request
+        try:
+            permit = issue_permit(vehicle)
+        except PermitSigningUnavailable as e:
+            return {"success": False, "message": f"Permit signing is unavailable: {e}"}, 503
+        vehicles_collection.update_one({"_id": vehicle["_id"], "permit": None}, {"$set": {"permit": permit}})
+        permit = vehicles_collection.find_one({"_id": vehicle["_id"]}, {"permit": 1})["permit"]
+
+    return {
+        "success": True,
+        "token": permit["token"],
+        "issuedAt": permit["issuedAt"],
+        "claims": permit["claims"]
+    }, 200
+
 """ 
 #### ADMIN ROUTES 
 """
@@ -508,21 +2737,17 @@ def get_client_information(current_user):
 def get_admin_dashboard(admin):
     try:
         # Get total counts
-        total_users = users_collection.count_documents({'role': {'$ne': 'admin'}})
-        total_applications = applications_collection.count_documents({})
-        total_pending_applications = applications_collection.count_documents({"status": {"$ne": "approved"}})
-        total_vehicles = vehicles_collection.count_documents({"status": "approved"})
-        total_officers = officers_collection.count_documents({})
+        stats = fan_out(
+            totalOperators=lambda: users_collection.count_documents({'role': {'$ne': 'admin'}}),
+            totalApplications=lambda: applications_collection.count_documents({}),
+            registeredVehicles=lambda: vehicles_collection.count_documents({"status": "approved"}),
+            totalOfficers=lambda: officers_collection.count_documents({}),
+            pendingReviews=lambda: applications_collection.count_documents({"status": {"$ne": "approved"}})
+        )
 
         return jsonify({
             'success': True,
-            'stats': {
-                'totalOperators': total_users,
-                'totalApplications': total_applications,
-                'registeredVehicles': total_vehicles,
-                'totalOfficers': total_officers,
-                'pendingReviews': total_pending_applications
-            }
+            'stats': stats
         }), 200
     
     except Exception as e:
@@ -556,34 +2781,30 @@ def get_operators(admin):
             ]
         
         skip = (page - 1) * limit
-        operators = list(users_collection.find(query).skip(skip).limit(limit).sort('createdAt', 1))
-        total = users_collection.count_documents(query)
+        keys, projection = select_fields(OPERATOR_FIELDS)
+        if cursor_mode():
+            operators, pagination = cursor_page(users_collection, query, 'createdAt', 1, limit, projection)
+        else:
+            page_results = fan_out(
+                operators=lambda: list(users_collection.find(query, projection).skip(skip).limit(limit).sort('createdAt', 1)),
+                total=lambda: users_collection.count_documents(query)
+            )
+            operators = page_results["operators"]
+            pagination = offset_pagination(page, limit, page_results["total"])
         
-        for operator in operators:
-            operator["_id"] = str(operator.get("_id", ""))
-    
-            operator['activePermits'] = applications_collection.count_documents({
-                'firstName': operator.get('firstName', ''),
-                'lastName': operator.get('lastName', ''),
-                'status': 'approved'
-            })
+        owner_ids = [str(operator["_id"]) for operator in operators]
+        if "activePermits" in keys:
+            active_permits = count_by_owner(applications_collection, owner_ids, {'status': 'approved'})
+        if "vehicles" in keys:
+            vehicle_counts = count_by_owner(vehicles_collection, owner_ids)
 
-            operator['vehicles'] = vehicles_collection.count_documents({
-                'ownerID': operator["_id"]
-            })
-
-            operator.pop("password", None)
-        
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
-        pagination = {
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "has_previous": page > 1,
-            "has_next": page < total_pages,
-            "previous_page": page - 1 if page > 1 else None,
-            "next_page": page + 1 if page < total_pages else None,
-        }
+        for index, operator in enumerate(operators):
+            operator["_id"] = str(operator.get("_id", ""))
+            if "activePermits" in keys:
+                operator['activePermits'] = active_permits.get(operator["_id"], 0)
+            if "vehicles" in keys:
+                operator['vehicles'] = vehicle_counts.get(operator["_id"], 0)
+            operators[index] = pick(operator, keys)
 
         return {
             'success': True,
@@ -591,6 +2812,8 @@ def get_operators(admin):
             "pagination": pagination
         }, 200
     
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
     except Exception as e:
         app.logger.error(f"{e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -625,8 +2848,9 @@ def update_operator(admin, operator_id):
         if result.matched_count == 0:
             return jsonify({"error": "Operator not found"}), 404
 
+        principal_cache.invalidate(("user", operator_id))
+        sync_plate_cards({"ownerID": operator_id})
         updated_operator = users_collection.find_one({"_id": ObjectId(operator_id)})
-        updated_operator["_id"] = str(updated_operator["_id"])
         updated_operator.pop("password", None)
 
         return jsonify({
@@ -648,14 +2872,15 @@ def delete_operator(admin, operator_id):
         if not operator:
             return jsonify({"error": "Operator not found"}), 404
 
-        applications_collection.delete_many({"operatorId": operator_id})
-        vehicles_collection.delete_many({"ownerID": operator_id})
-
         result = users_collection.delete_one({"_id": ObjectId(operator_id)})
+        principal_cache.invalidate(("user", operator_id))
         if result.deleted_count == 0:
             return jsonify({"error": "Operator not deleted"}), 400
 
-        return jsonify({"message": "Operator deleted successfully"}), 200
+        # The operator's applications, vehicles and files are removed in the background
+        job_id = enqueue_job("delete_operator", {"operatorId": operator_id})
+
+        return jsonify({"message": "Operator deleted successfully", "jobId": str(job_id)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -708,8 +2933,8 @@ def get_vehicles(admin):
     try:
         status = request.args.get('status')
         search = request.args.get("search", None)
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 10))
+        page = max(1, int(request.args.get('page', 1)))
+        limit = min(50, max(1, int(request.args.get('limit', 10))))
         
         query = {}
         if status and status != 'default':
@@ -724,16 +2949,32 @@ def get_vehicles(admin):
                 {'model': search_regex}
             ]
         skip = (page - 1) * limit
-        vehicles = list(vehicles_collection.find(query).skip(skip).limit(limit).sort('createdAt', 1))
-        total = vehicles_collection.count_documents(query)
-        
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
+        keys, projection = select_fields(ADMIN_VEHICLE_FIELDS)
+        if cursor_mode():
+            vehicles, pagination = cursor_page(vehicles_collection, query, 'createdAt', 1, limit, projection)
+        else:
+            page_results = fan_out(
+                vehicles=lambda: list(vehicles_collection.find(query, projection).skip(skip).limit(limit).sort('createdAt', 1)),
+                total=lambda: vehicles_collection.count_documents(query)
+            )
+            vehicles = page_results["vehicles"]
+            pagination = offset_pagination(page, limit, page_results["total"])
+
+        operator_names = {}
+        if "operatorName" in keys:
+            owners = users_collection.find(
+                {"_id": {"$in": to_object_ids(vehicle.get("ownerID") for vehicle in vehicles)}},
+                {"businessInformation.companyName": 1}
+            )
+            operator_names = {
+                str(owner["_id"]): owner.get("businessInformation", {}).get("companyName", "N/A")
+                for owner in owners
+            }
 
         results = []
         for vehicle in vehicles:
-            operator = users_collection.find_one({"_id" : ObjectId(vehicle.get("ownerID"))})
             trimmedVehicle = {
-                "operatorName" : operator["businessInformation"]["companyName"],
+                "operatorName" : operator_names.get(str(vehicle.get("ownerID")), "N/A"),
                 "id" : str(vehicle.get("_id")),
                 "registrationNumber" : vehicle.get("registrationNumber"),
                 "make" : vehicle.get("make"),
@@ -745,17 +2986,7 @@ def get_vehicles(admin):
                 "operatingRoute": vehicle.get("operatingRoute")
 
             }
-            results.append(trimmedVehicle)
-    
-        pagination = {
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "has_previous": page > 1,
-            "has_next": page < total_pages,
-            "previous_page": page - 1 if page > 1 else None,
-            "next_page": page + 1 if page < total_pages else None,
-        }
+            results.append(pick(trimmedVehicle, keys))
 
         return {
             'success': True,
@@ -763,6 +2994,8 @@ def get_vehicles(admin):
             "pagination":  pagination
         }, 200
     
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
     except Exception as e:
         app.logger.error(f"Get vehicles error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -785,7 +3018,6 @@ def get_vehicle(admin, vehicle_id):
             "message": "Vehicle not found"
         }, 404 
     
-    vehicle = serialize_application(vehicle)
     return {
         "success": True,
         "vehicle": vehicle
@@ -809,13 +3041,20 @@ def update_vehicle(admin, vehicle_id):
             'driverLicenseExpiry': data.get('driverLicenseExpiry', vehicle['driverLicenseExpiry']),
             'insuranceExpiryDate': data.get('insuranceExpiryDate', vehicle['insuranceExpiryDate']),
             'roadworthyExpiryDate': data.get('roadworthyExpiryDate', vehicle['roadworthyExpiryDate']),
-            'updatedAt': datetime.now(cat_tz)
+            'updatedAt': datetime.now(cat_tz),
+            'version': next_vehicle_versions()[0],
+            'versionedAt': datetime.now(cat_tz)
         }
+        permit_update, replaced_permit = reconcile_permit(vehicle, update_data)
+        update_data.update(permit_update)
         
         vehicles_collection.update_one(
             {'_id': ObjectId(vehicle_id)},
             {'$set': update_data}
         )
+        revoke_permits([replaced_permit], "reissued" if permit_update.get("permit") else "status_changed")
+        sync_plate_cards({'_id': ObjectId(vehicle_id)})
+        invalidate_client_dashboards([vehicle.get('ownerID')])
         
         return {
             'success': True,
@@ -840,16 +3079,13 @@ def delete_vehicle(admin, vehicle_id):
                 'error': 'Cannot delete active vehicle. Please change status first.'
             }), 400
 
-        uploaded_files = vehicle.get('uploadedFiles', {})
-        for key, file_path in uploaded_files.items():
-            full_path = os.path.join(app.root_path, file_path)
-            if os.path.exists(full_path):
-                try:
-                    os.remove(full_path)
-                except Exception as e:
-                    print(f"Failed to delete file {full_path}: {e}")
-
         vehicles_collection.delete_one({'_id': ObjectId(vehicle_id)})
+        release_files(vehicle.get('uploadedFiles', {}).values())
+        record_vehicle_tombstones([vehicle])
+        revoke_permits([vehicle.get('permit')], "vehicle_deleted")
+        sync_plate_cards(drop={'vehicle_id': ObjectId(vehicle_id)})
+        registered_plates.discard(vehicle['registrationNumber'])
+        invalidate_client_dashboards([vehicle.get('ownerID')])
 
         return jsonify({
             'success': True,
@@ -865,6 +3101,11 @@ def delete_vehicle(admin, vehicle_id):
 @admin_required
 def get_all_applications(admin):
     try:
+        etag = application_list_etag()
+        cached = cached_response(etag)
+        if cached:
+            return cached
+
         status = request.args.get('status')
         operator = request.args.get('operator')
         page = int(request.args.get('page', 1))
@@ -877,8 +3118,16 @@ def get_all_applications(admin):
         if operator:
             query['operatorName'] = {'$regex': operator, '$options': 'i'}
 
-        total = applications_collection.count_documents(query)
-        applications = list(applications_collection.find(query).skip(skip).limit(limit).sort('createdAt', -1))
+        keys, projection = select_fields(ADMIN_APPLICATION_FIELDS)
+        if cursor_mode():
+            applications, pagination = cursor_page(applications_collection, query, 'createdAt', -1, limit, projection)
+        else:
+            page_results = fan_out(
+                total=lambda: applications_collection.count_documents(query),
+                applications=lambda: list(applications_collection.find(query, projection).skip(skip).limit(limit).sort('createdAt', -1))
+            )
+            applications = page_results["applications"]
+            pagination = offset_pagination(page, limit, page_results["total"])
 
         results = []
         for application in applications:
@@ -893,23 +3142,15 @@ def get_all_applications(admin):
                 "vehicleCount": application.get("vehicleCount"),
                 "submittedDate": application.get("submittedDate"),
             }
-            results.append(trimmedApplication)
-
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
-        pagination = {
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "has_previous": page > 1,
-            "has_next": page < total_pages,
-            "previous_page": page - 1 if page > 1 else None,
-            "next_page": page + 1 if page < total_pages else None,
-        }
-        return {
+            results.append(pick(trimmedApplication, keys))
+
+        return versioned_response(etag, {
             "success": True,
             "results": results,
             "pagination": pagination
-        }, 200
+        })
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -923,8 +3164,10 @@ def search_admin_application(admin):
         if not query:
             return jsonify({"error": "applicationId query parameter is required"}), 400
 
+        keys, projection = select_fields(ADMIN_APPLICATION_FIELDS)
         applications = list(applications_collection.find(
-            {"applicationId": {"$regex": query, "$options": "i"}}
+            {"applicationId": {"$regex": query, "$options": "i"}},
+            projection
         ).limit(10))
 
         if not applications:
@@ -942,7 +3185,7 @@ def search_admin_application(admin):
                 "vehicleCount": application.get("vehicleCount"),
                 "submittedDate": application.get("submittedDate"),
             }
-            results.append(trimmedApplication)
+            results.append(pick(trimmedApplication, keys))
 
         return jsonify(results), 200
 
@@ -974,13 +3217,17 @@ def update_application_status(admin, application_id):
             "completed" : True
         }
         
-        applications_collection.update_one(
+        application = applications_collection.find_one_and_update(
             {'_id': ObjectId(application_id)},
             {
                 '$set': update_data,
-                '$push': {'timeline': timeline_entry}
-            }
+                '$push': {'timeline': timeline_entry},
+                '$inc': {'version': 1}
+            },
+            projection={'ownerID': 1}
         )
+        if application:
+            bump_application_lists([application.get('ownerID')])
         
         return jsonify({'message': 'Status updated successfully'})
     
@@ -1030,9 +3277,6 @@ def create_officer(admin):
         if result.inserted_id:
             token = generate_token(result)
 
-            officer_doc["_id"] = str(result.inserted_id)
-            officer_doc["createdAt"] = officer_doc["createdAt"].isoformat()
-            officer_doc["updatedAt"] = officer_doc["updatedAt"].isoformat()
             officer_doc.pop("password", None)
 
             return {
@@ -1071,24 +3315,18 @@ def get_officers(admin):
             ]
         
         skip = (page - 1) * limit
-        officers = list(officers_collection.find(query).skip(skip).limit(limit).sort('createdAt', 1))
-        total = officers_collection.count_documents(query)
+        keys, projection = select_fields(OFFICER_FIELDS)
+        if cursor_mode():
+            officers, pagination = cursor_page(officers_collection, query, 'createdAt', 1, limit, projection)
+        else:
+            page_results = fan_out(
+                officers=lambda: list(officers_collection.find(query, projection).skip(skip).limit(limit).sort('createdAt', 1)),
+                total=lambda: officers_collection.count_documents(query)
+            )
+            officers = page_results["officers"]
+            pagination = offset_pagination(page, limit, page_results["total"])
         
-        for officer in officers:
-            officer["_id"] = str(officer.get("_id", ""))    
-            officer.pop("password", None)
-            officer.pop("updatedAt")
-
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
-        pagination = {
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "has_previous": page > 1,
-            "has_next": page < total_pages,
-            "previous_page": page - 1 if page > 1 else None,
-            "next_page": page + 1 if page < total_pages else None,
-        }
+        officers = [pick(officer, keys) for officer in officers]
 
         return {
             'success': True,
@@ -1096,6 +3334,8 @@ def get_officers(admin):
             "pagination": pagination
         }, 200
     
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
     except Exception as e:
         app.logger.error(f"{e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -1132,10 +3372,8 @@ def update_officer(admin, officer_id):
         if result.matched_count == 0:
             return jsonify({"message": "Officer not found"}), 404
 
+        principal_cache.invalidate(("officer", officer_id))
         updated_officer = officers_collection.find_one({"_id": ObjectId(officer_id)})
-        updated_officer["_id"] = str(updated_officer["_id"])
-        updated_officer["createdAt"] = updated_officer["createdAt"].isoformat()
-        updated_officer["updatedAt"] = updated_officer["updatedAt"].isoformat()
         updated_officer.pop("password", None)
 
         return {
@@ -1153,18 +3391,20 @@ def update_officer(admin, officer_id):
 @admin_required
 def delete_officer(admin, identifier):
     try:
-        result = None
+        officer = None
 
         try:
-            result = officers_collection.delete_one({"_id": ObjectId(identifier)})
+            officer = officers_collection.find_one_and_delete({"_id": ObjectId(identifier)}, {"_id": 1})
         except Exception:
-            result = None
-        if not result or result.deleted_count == 0:
-            result = officers_collection.delete_one({"badgeNumber": identifier})
+            officer = None
+        if not officer:
+            officer = officers_collection.find_one_and_delete({"badgeNumber": identifier}, {"_id": 1})
 
-        if result.deleted_count == 0:
+        if not officer:
             return jsonify({"error": "Officer not found"}), 404
 
+        principal_cache.invalidate(("officer", str(officer["_id"])))
+
         return jsonify({"message": "Officer deleted successfully"}), 200
 
     except Exception as e:
@@ -1177,6 +3417,7 @@ def edit_application(admin, application_id):
     try:
         data = request.get_json()
         data.pop("_id", None)
+        data.pop("version", None)
         now = datetime.now(cat_tz)
         new_timeline_entry = {
             "status": "edited",
@@ -1190,16 +3431,19 @@ def edit_application(admin, application_id):
         if "timeline" in data:
             del data["timeline"]
 
-        result = applications_collection.update_one(
+        application = applications_collection.find_one_and_update(
             {"_id": ObjectId(application_id)},
             {
                 "$set": data,
-                "$push": {"timeline": new_timeline_entry}
-            }
+                "$push": {"timeline": new_timeline_entry},
+                "$inc": {"version": 1}
+            },
+            projection={"ownerID": 1}
         )
 
-        if result.matched_count == 0:
+        if not application:
             return jsonify({"error": "Application not found"}), 404
+        bump_application_lists([application.get("ownerID"), data.get("ownerID")])
 
         return jsonify({"message": "Application updated successfully"}), 200
 
@@ -1216,22 +3460,46 @@ def delete_application(admin, application_id):
         if not application:
             return jsonify({"error": "Application not found"}), 404
 
-        uploaded_files = application.get("uploadedFiles", {})
-        for key, file_path in uploaded_files.items():
-            full_path = os.path.join(app.root_path, file_path)
-            if os.path.exists(full_path):
-                try:
-                    os.remove(full_path)
-                except Exception as e:
-                    print(f"Failed to delete file {full_path}: {e}")
-
         result = applications_collection.delete_one({"applicationId": application_id})
+        bump_application_lists([application.get("ownerID")])
+        release_files(application.get("uploadedFiles", {}).values())
 
         return jsonify({"message": "Application and associated files deleted successfully"}), 200
 
     except Exception as e:
         return jsonify({"error": f"Error deleting application: {str(e)}"}), 500
     
+@app.route("/api/admin/cache/stats", methods = ["GET"])
+@token_required
+@admin_required
+def get_cache_stats(admin):
+    return {
+        "success" : True,
+        "principalCache" : principal_cache.stats(),
+        "responseCache" : response_cache.stats(),
+        "dashboardCache" : dashboard_cache.stats()
+    }, 200
+
+@app.route("/api/admin/jobs/<job_id>", methods = ["GET"])
+@token_required
+@admin_required
+def get_job(admin, job_id):
+    try:
+        job = jobs_collection.find_one({"_id": ObjectId(job_id)})
+    except InvalidId:
+        return {"success": False, "message": "Invalid job ID"}, 400
+    if not job:
+        return {"success": False, "message": "Job not found"}, 404
+    return jsonify({"success": True, "job": serialize_job(job)}), 200
+
+@app.route("/api/admin/jobs/scan-orphans", methods = ["POST"])
+@token_required
+@admin_required
+def scan_orphans(admin):
+    data = request.get_json(silent=True) or {}
+    job_id = enqueue_job("scan_orphans", {"apply": bool(data.get("apply"))})
+    return jsonify({"success": True, "jobId": str(job_id)}), 202
+
 @app.route("/api/admin/s/operator", methods = ["GET"])
 @token_required
 @admin_required
@@ -1275,21 +3543,18 @@ def get_operator(admin):
 @admin_required
 def mark_violation_paid(admin, violation_id):
     try:
-        violation = violations_collection.find_one({"_id": ObjectId(violation_id)})
-        
-        if not violation:
-            return jsonify({"error": "Violation not found"}), 404
-
-        if violation.get("status") == "paid":
-            return jsonify({"message": "Violation already marked as paid"}), 200
-
-        result = violations_collection.update_one(
-            {"_id": ObjectId(violation_id)},
+        # Only the request that flips unpaid -> paid adjusts the vehicle summary
+        violation = violations_collection.find_one_and_update(
+            {"_id": ObjectId(violation_id), "status": {"$ne": "paid"}},
             {"$set": {"status": "paid"}}
         )
 
-        if result.modified_count == 0:
-            return jsonify({"error": "Failed to update violation"}), 500
+        if not violation:
+            if violations_collection.count_documents({"_id": ObjectId(violation_id)}, limit=1):
+                return jsonify({"message": "Violation already marked as paid"}), 200
+            return jsonify({"error": "Violation not found"}), 404
+
+        on_violation_paid(violation)
 
         return jsonify({
             "message": "Violation marked as paid successfully",
@@ -1305,50 +3570,24 @@ def mark_violation_paid(admin, violation_id):
 @admin_required
 def get_violations(admin):
     try:
-        page = int(request.args.get("page", 1))
-        limit = int(request.args.get("limit", 10))
+        page = max(1, int(request.args.get("page", 1)))
+        limit = min(1000, max(1, int(request.args.get("limit", 10))))
         skip = (page - 1) * limit
 
-        total = violations_collection.count_documents({})
-        violations_cursor = violations_collection.find().sort("date", -1).skip(skip).limit(limit)
-
-        violations = []
-        for v in violations_cursor:
-            officer = officers_collection.find_one({"_id": ObjectId(v.get("officer_id"))})
-            vehicle_owner = ""
-            plate = ""
-            try:
-                vehicle = vehicles_collection.find_one({"_id": ObjectId(v.get("vehicle_id"))})
-                if vehicle:
-                    owner = users_collection.find_one({"_id": ObjectId(vehicle.get("ownerID"))})
-                    plate = owner.get("registrationNumber")
-                    if owner:
-                        vehicle_owner = f"{owner.get('firstName', '')} {owner.get('lastName', '')}".strip()
-            
-            except InvalidId:
-                vehicle_owner = "Not registered"
-
-            violations.append({
-                "_id": str(v["_id"]),
-                "plate" : v.get("plate", plate),
-                "vehicle_owner": vehicle_owner,
-                "officer_name": f"{officer.get('firstName', '')} {officer.get('lastName', '')}" if officer else "N/A",
-                "violation": v.get("violation"),
-                "fine": v.get("fine"),
-                "date": v.get("date"),
-                "status": v.get("status", "unpaid")
-            })
-
-        total_pages = (total + limit - 1) // limit if total > 0 else 1
-        pagination = {
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "has_previous": page > 1,
-            "has_next": page < total_pages,
-            "previous_page": page - 1 if page > 1 else None,
-            "next_page": page + 1 if page < total_pages else None,
-        }
+        keys, _ = select_fields(VIOLATION_FIELDS)
+        if cursor_mode():
+            match = keyset_query({}, "date", -1, request.args.get("cursor"))
+            rows = fetch_violations_page(match, 0, limit + 1, list(dict.fromkeys(keys + ["_id", "date"])))
+            pagination = cursor_pagination(rows, limit, violations_collection, {},
+                lambda row: (row["date"], ObjectId(row["_id"])))
+            violations = [pick(row, keys) for row in rows[:limit]]
+        else:
+            page_results = fan_out(
+                total=lambda: violations_collection.count_documents({}),
+                violations=lambda: fetch_violations_page({}, skip, limit, keys)
+            )
+            violations = page_results["violations"]
+            pagination = offset_pagination(page, limit, page_results["total"])
 
         return jsonify({
             "violations": violations,
@@ -1356,6 +3595,8 @@ def get_violations(admin):
             "pagination": pagination
         }), 200
 
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
     except Exception as e:
         app.logger.error(f"Error fetching violations: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -1382,13 +3623,13 @@ def officer_login():
                 "isAuth" : False,
             }, 401
 
-        if not bcrypt.checkpw(password.encode('utf-8'), officer['password']):
+        if not check_password(password, officer['password']):
             return jsonify({'message': 'Invalid credentials'}), 401
             
         token = generate_token(officer)
         officers_collection.update_one(
             {'_id': officer['_id']},
-            {'$set': {'lastLogin': datetime.now(cat_tz)}}
+            {'$set': {'lastLogin': datetime.now(cat_tz), **upgraded_password_fields(password, officer['password'])}}
         )
         
         officer_data = {
@@ -1408,6 +3649,8 @@ def officer_login():
         })
 
 
+    except PasswordHasherBusy:
+        return busy_response()
     except Exception as e:
         return {
             "success" : False,
@@ -1421,57 +3664,136 @@ def search_license(current_user):
     if not reg_number:
         return jsonify({"error": "License plate number is required"}), 400
 
-    vehicle = vehicles_collection.find_one({"registrationNumber": reg_number.upper()})
-    if not vehicle:
+    payload = find_plate_cards([reg_number]).get(normalize_plate(reg_number))
+    if payload:
+        return jsonify(payload), 200
+
+    key_matches = list(plate_cards_collection.find({"plateKey": plate_key(reg_number)}, {"payload": 1}).limit(2))
+    if len(key_matches) == 1:
         return jsonify({
-            "licensePlate": reg_number.upper(),
-            "status": "not_found",
-            "operatorName": "Not Found",
-            "contactPerson": "N/A",
-            "vehicleModel": "N/A",
-            "capacity": 0,
-            "route": "N/A",
-            "permitNumber": "N/A",
-            "phone": "N/A",
-            "permitExpiry": "N/A",
-            "lastInspection": "N/A",
-            "insuranceExpiry": "N/A",
-            "roadworthyExpiry": "N/A",
-            "violations": []
-        }), 404
-
-    operator = users_collection.find_one({"_id": ObjectId(vehicle.get("ownerID"))})
-
-    violations_cursor = violations_collection.find({"vehicle_id": vehicle["_id"]})
-    violations = []
-    for v in violations_cursor:
-        violations.append({
-            "id": str(v["_id"]),
-            "officer_id": str(v["officer_id"]),
-            "violation": v["violation"],
-            "fine": v["fine"],
-            "date": v["date"],
-            "status": v.get("status", "unpaid")
+            **key_matches[0]["payload"],
+            "match": {"type": "plateKey", "query": reg_number.upper()}
+        }), 200
+
+    return jsonify({
+        **plate_not_found_payload(reg_number.upper()),
+        "suggestions": suggest_plates(reg_number)
+    }), 404
+
+@app.route("/api/officer/search/batch", methods=["POST"])
+@officer_required
+def search_license_batch(current_user):
+    data = request.get_json(silent=True) or {}
+    plates = data.get("plates")
+    limit = app.config['PLATE_BATCH_LIMIT']
+
+    if not isinstance(plates, list) or not plates:
+        return jsonify({"error": "A non-empty list of plates is required"}), 400
+    if len(plates) > limit:
+        return jsonify({"error": f"At most {limit} plates per request"}), 400
+
+    plates = [str(plate) for plate in plates]
+    payloads = find_plate_cards(plates)
+
+    results = []
+    for plate in plates:
+        payload = payloads.get(normalize_plate(plate))
+        results.append({
+            "plate": plate,
+            "found": payload is not None,
+            "result": payload or plate_not_found_payload(plate.upper())
         })
 
-    response = {
-        "vehicleID": str(vehicle["_id"]),
-        "licensePlate": vehicle["registrationNumber"],
-        "status": vehicle.get("status", "unknown"),
-        "operatorName": f"{operator.get('firstName')} {operator.get('lastName')}",
-        "contactPerson": vehicle.get("driverName", "N/A"),
-        "vehicleModel": f"{vehicle.get('make', '')} {vehicle.get('model', '')}".strip(),
-        "capacity": vehicle.get("capacity", 0),
-        "phone": operator["businessInformation"].get("contactPerson", "N/A"),
-        "route": vehicle.get("operatingRoute", "N/A"),
-        "permitNumber": vehicle.get("vehicleId", "N/A"),
-        "permitExpiry": vehicle.get("driverLicenseExpiry", "N/A"),
-        "lastInspection": vehicle.get("registrationDate", "N/A"),
-        "insuranceExpiry": vehicle.get("insuranceExpiryDate", "N/A"),
-        "roadworthyExpiry": vehicle.get("roadworthyExpiryDate", "N/A"),
-        "violations": violations
-    }
-    return jsonify(response), 200
+    return jsonify({"success": True, "results": results}), 200
+
+@app.route("/api/officer/sync/vehicles", methods=["GET"])
+@officer_required
+def sync_vehicles(current_user):
+    try:
+        since = max(0, int(request.args.get("since", 0)))
+    except ValueError:
+        return jsonify({"error": "since must be an integer version"}), 400
+
+    # The reported watermark lags writes still settling, and everything past
+    # since is sent, so a version that lands late is picked up next sync
+    version = latest_vehicle_version(datetime.now(cat_tz) - timedelta(seconds=app.config['SYNC_SETTLE_SECONDS']))
+    etag = f'"vehicles-{since}-{version}-{latest_vehicle_version()}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers={"ETag": etag})
+
+    full = since == 0
+    if full:
+        upserts, deletes = sync_rows({}, full=True), []
+    else:
+        window = {"version": {"$gt": since}}
+        upserts = sync_rows(window, full=False)
+        deletes = [tombstone["plate"] for tombstone in vehicle_tombstones_collection.find(window, {"_id": 0, "plate": 1})]
+
+    # Clients apply deletes before upserts, so a re-registered plate survives
+    body = json.dumps({
+        "version": version,
+        "full": full,
+        "columns": SYNC_COLUMNS,
+        "upserts": upserts,
+        "deletes": deletes
+    }, separators=(",", ":"), default=str).encode("utf-8")
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(body, status=200, mimetype="application/json", headers=headers)
+
+@app.cli.group("permits")
+def permits_cli():
+    """Manage permit signing."""
+
+@permits_cli.command("generate-key")
+def generate_permit_key_command():
+    if Ed25519PrivateKey is None:
+        raise click.ClickException("cryptography is not installed")
+    raw = Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+    )
+    # Printed rather than stored: the same value must be deployed to every API node
+    print(f"PERMIT_SIGNING_KEY={b64url(raw)}")
+
+@app.route("/api/officer/permits/public-key", methods=["GET"])
+def get_permit_public_key():
+    try:
+        permit_key_id()
+    except PermitSigningUnavailable as e:
+        return jsonify({"error": f"Permit signing is unavailable: {e}"}), 503
+    return jsonify({
+        "algorithm": "Ed25519",
+        "keyId": permit_key_id(),
+        "publicKey": b64url(permit_public_key_bytes()),
+        "tokenPrefix": PERMIT_TOKEN_PREFIX
+    }), 200
+
+@app.route("/api/officer/permits/revocations", methods=["GET"])
+@officer_required
+def get_permit_revocations(current_user):
+    try:
+        since = max(0, int(request.args.get("since", 0)))
+    except ValueError:
+        return jsonify({"error": "since must be an integer sequence number"}), 400
+
+    latest = permit_revocations_collection.find_one({}, {"_id": 0, "seq": 1}, sort=[("seq", -1)])
+    seq = latest["seq"] if latest else 0
+    etag = f'"revocations-{since}-{seq}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers={"ETag": etag})
+
+    revoked = [
+        revocation["jti"]
+        for revocation in permit_revocations_collection.find({"seq": {"$gt": since}}, {"_id": 0, "jti": 1}).sort("seq", 1)
+    ]
+    response = jsonify({"seq": seq, "revoked": revoked})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response, 200
 
 @app.route("/api/officer/violations/<vehicle_id>", methods=["POST"])
 @officer_required
@@ -1479,33 +3801,124 @@ def add_violation(officer, vehicle_id):
     data = request.get_json()
     if not data:
         return jsonify({"error": "Missing violation data"}), 400
-    try:
-        V_ID =  ObjectId(vehicle_id)
-    except InvalidId:
-        V_ID = vehicle_id
 
-    violation = {
-        "_id": ObjectId(),
-        "vehicle_id": V_ID,
-        "officer_id": ObjectId(officer.get("_id")),
-        "violation": data.get("violation"),
-        "fine": data.get("fine"),
-        "plate" : data.get("plate", ""),
-        "date": datetime.now(cat_tz).strftime("%Y-%m-%d"),
-        "status": "unpaid",
-    }
+    violation = build_violation(officer, vehicle_id, data)
+    if violation.get("idempotencyKey") and not has_index(violations_collection, "idempotencyKey_unique"):
+        # Without the unique index a retry would be stored twice
+        return jsonify({"error": "Violation recording is unavailable until indexes are built"}), 503
 
-    result = violations_collection.insert_one(violation)
+    try:
+        result = violations_collection.insert_one(violation)
+    except DuplicateKeyError:
+        # A retried request: answer with the violation the first attempt stored
+        violation = violations_collection.find_one({"idempotencyKey": violation["idempotencyKey"]})
+        return jsonify({"message": "Violation already recorded", "violation": serialize_violation(violation)}), 200
 
     if not result.inserted_id:
         return jsonify({"error": "Failed to save violation"}), 500
 
-    violation["id"] = str(violation["_id"])
-    violation["vehicle_id"] = str(violation["vehicle_id"])
-    violation["officer_id"] = str(violation["officer_id"])
-    del violation["_id"]
+    on_violations_recorded([violation])
+
+    return jsonify({"message": "Violation added", "violation": serialize_violation(violation)}), 201
+
+@app.route("/api/officer/violations/batch", methods=["POST"])
+@officer_required
+def add_violations_batch(officer):
+    data = request.get_json(silent=True) or {}
+    items = data.get("violations")
+    limit = app.config['VIOLATION_BATCH_LIMIT']
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty list of violations is required"}), 400
+    if len(items) > limit:
+        return jsonify({"error": f"At most {limit} violations per request"}), 400
+    if not has_index(violations_collection, "idempotencyKey_unique"):
+        # Without the unique index a resubmitted batch would be stored twice
+        return jsonify({"error": "Violation recording is unavailable until indexes are built"}), 503
+
+    results = [None] * len(items)
+    documents, positions = [], []
+    for position, item in enumerate(items):
+        key = item.get("idempotencyKey") if isinstance(item, dict) else None
+        if not isinstance(key, str) or not key or len(key) > 128 or not item.get("violation") or not item.get("vehicle_id"):
+            results[position] = {"idempotencyKey": key, "status": "invalid",
+                                 "error": "idempotencyKey, vehicle_id and violation are required"}
+            continue
+        documents.append(build_violation(officer, item["vehicle_id"], item))
+        positions.append(position)
+
+    failed = {}
+    if documents:
+        try:
+            violations_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+    duplicate_keys = [documents[index]["idempotencyKey"] for index, error in failed.items() if error.get("code") == 11000]
+    existing = {
+        violation["idempotencyKey"]: str(violation["_id"])
+        for violation in violations_collection.find({"idempotencyKey": {"$in": duplicate_keys}}, {"idempotencyKey": 1})
+    } if duplicate_keys else {}
+
+    recorded = []
+    for index, (document, position) in enumerate(zip(documents, positions)):
+        error = failed.get(index)
+        key = document["idempotencyKey"]
+        if error is None:
+            results[position] = {"idempotencyKey": key, "status": "created", "id": str(document["_id"])}
+            recorded.append(document)
+        elif error.get("code") == 11000:
+            results[position] = {"idempotencyKey": key, "status": "duplicate", "id": existing.get(key)}
+        else:
+            results[position] = {"idempotencyKey": key, "status": "error", "error": error.get("errmsg", "Write failed")}
+
+    on_violations_recorded(recorded)
+
+    return jsonify({
+        "success": True,
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "results": results
+    }), 200
+
+@app.route("/api/officer/vehicles/<vehicle_id>/violations", methods=["GET"])
+@officer_required
+def get_vehicle_violations(officer, vehicle_id):
+    try:
+        V_ID = ObjectId(vehicle_id)
+    except (InvalidId, TypeError):
+        return jsonify({"error": "Invalid vehicle ID"}), 400
+
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+        limit = min(50, max(1, int(request.args.get("limit", 10))))
+        query = {"vehicle_id": V_ID}
+
+        if cursor_mode():
+            violations, pagination = cursor_page(violations_collection, query, "date", -1, limit)
+        else:
+            page_results = fan_out(
+                total=lambda: violations_collection.count_documents(query),
+                violations=lambda: list(
+                    violations_collection.find(query)
+                    .sort([("date", -1), ("_id", -1)])
+                    .skip((page - 1) * limit)
+                    .limit(limit)
+                )
+            )
+            violations = page_results["violations"]
+            pagination = offset_pagination(page, limit, page_results["total"])
+
+        return jsonify({
+            "violations": [serialize_violation(violation) for violation in violations],
+            "success": True,
+            "pagination": pagination
+        }), 200
 
-    return jsonify({"message": "Violation added", "violation": violation}), 201
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}, 400
+    except Exception as e:
+        app.logger.error(f"Error fetching vehicle violations: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
 
 """
@@ -1520,20 +3933,81 @@ def download_file():
         if not file_path:
             return jsonify({'error': 'File path is required'}), 400
         
-        if not file_path.startswith('uploads/'):
+        digest, filename = parse_blob_ref(file_path)
+        key = blob_key(digest) if digest else legacy_key(file_path)
+        if not key:
             return jsonify({'error': 'Invalid file path'}), 400
         
-        full_path = os.path.join(app.config['UPLOAD_FOLDER'], file_path.replace('uploads/', ''))
-        
-        if not os.path.exists(full_path):
+        if not storage.exists(key):
             return jsonify({'error': 'File not found'}), 404
         
-        return send_file(full_path, as_attachment=True)
+        return storage.respond(key, filename, etag=digest)
     
     except Exception as e:
         app.logger.error(f"Error downloading file: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/files/preview', methods=['GET'])
+def preview_file():
+    try:
+        digest, filename = parse_blob_ref(request.args.get('path'))
+        size = request.args.get('size', 'thumb')
+        if not digest:
+            return jsonify({'error': 'A blob reference is required'}), 400
+        if size not in MEDIA_DERIVATIVES:
+            return jsonify({'error': f"size must be one of {', '.join(MEDIA_DERIVATIVES)}"}), 400
+
+        job = media_jobs_collection.find_one({"_id": digest})
+        if not job:
+            return jsonify({'error': 'No preview for this file'}), 404
+        if job["status"] in ("pending", "processing"):
+            response = jsonify({'status': job["status"]})
+            response.headers["Retry-After"] = "2"
+            return response, 202
+
+        # Only oversized photos get an optimized copy; the preview stands in otherwise
+        if size == "optimized" and size not in job.get("derivatives", []):
+            size = "preview"
+        key = derived_key(digest, size)
+        if size not in job.get("derivatives", []) or not storage.exists(key):
+            return jsonify({'error': 'No preview for this file', 'status': job["status"]}), 404
+
+        name = f"{os.path.splitext(filename)[0]}-{size}.jpg"
+        return storage.respond(key, name, etag=f"{digest}-{size}", as_attachment=False)
+
+    except Exception as e:
+        app.logger.error(f"Error serving preview: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/files/media', methods=['GET'])
+def get_media_status():
+    try:
+        refs = request.args.getlist('path')
+        digests = {ref: parse_blob_ref(ref)[0] for ref in refs}
+        jobs = {
+            job["_id"]: job
+            for job in media_jobs_collection.find(
+                {"_id": {"$in": [digest for digest in digests.values() if digest]}},
+                {"status": 1, "kind": 1, "derivatives": 1, "error": 1}
+            )
+        }
+        return jsonify({
+            "success": True,
+            "files": {
+                ref: {
+                    "status": jobs[digest]["status"],
+                    "kind": jobs[digest].get("kind"),
+                    "derivatives": jobs[digest].get("derivatives", []),
+                    "error": jobs[digest].get("error")
+                } if digest in jobs else {"status": "none"}
+                for ref, digest in digests.items()
+            }
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error fetching media status: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/vehicles/register', methods=['POST'])
 @token_required
 def register_vehicle(current_user):
@@ -1541,9 +4015,11 @@ def register_vehicle(current_user):
         form = request.form
         files = request.files
 
-        existing_vehicle = vehicles_collection.find_one({
-            'registrationNumber': form['registrationNumber'].upper()
-        })
+        # Plates differing only in spacing or punctuation are the same plate at the roadside
+        existing_vehicle = vehicles_collection.find_one({'$or': [
+            {'registrationNumber': form['registrationNumber'].upper()},
+            {'normalizedPlate': normalize_plate(form['registrationNumber'])}
+        ]})
         
         if existing_vehicle:
             return jsonify({'error': 'Vehicle with this registration number already exists'}), 409
@@ -1551,16 +4027,22 @@ def register_vehicle(current_user):
         vehicle_id = generate_unique_vehicle_id()
 
         saved_files = {}
-        for key in ['vehicleDocuments', 'insuranceCertificates', 'driversLicenses']:
-            file = files.get(key)
-            if file:
-                file_path = save_file(file)
-                saved_files[key] = "NULL" if not file_path else file_path
+        try:
+            for key in ['vehicleDocuments', 'insuranceCertificates', 'driversLicenses']:
+                file = files.get(key)
+                if file:
+                    file_path = save_file(file)
+                    saved_files[key] = "NULL" if not file_path else file_path
+        except BlobStoreBusy:
+            release_files(saved_files.values())
+            return blob_store_busy_response()
 
         vehicle_doc = {
             "ownerID" : str(current_user.get('_id')) if  current_user.get("role") == "operator" else form["ownerID"],
             'vehicleId': vehicle_id,
             'registrationNumber': form['registrationNumber'].upper(),
+            'normalizedPlate': normalize_plate(form['registrationNumber']),
+            'plateKey': plate_key(form['registrationNumber']),
             'make': form['make'],
             'model': form['model'],
             'year': int(form['year']),
@@ -1578,14 +4060,24 @@ def register_vehicle(current_user):
             'driverLicenseNumber': form['driverLicenseNumber'],
             'driverLicenseExpiry': form['driverLicenseExpiry'],
             'status': 'under_review',
+            'version': next_vehicle_versions()[0],
+            'versionedAt': datetime.now(cat_tz),
             "uploadedFiles" : saved_files,
             'registrationDate': datetime.now(cat_tz).strftime('%Y-%m-%d'),
             'createdAt': datetime.now(cat_tz),
             'updatedAt': datetime.now(cat_tz)
         }
 
-        result = vehicles_collection.insert_one(vehicle_doc)
+        try:
+            result = vehicles_collection.insert_one(vehicle_doc)
+        except DuplicateKeyError:
+            release_files(saved_files.values())
+            return jsonify({'error': 'Vehicle with this registration number already exists'}), 409
+        enqueue_media(saved_files.values())
         vehicle_doc['_id'] = str(result.inserted_id)
+        sync_plate_cards({'_id': result.inserted_id})
+        registered_plates.add(vehicle_doc['registrationNumber'])
+        invalidate_client_dashboards([vehicle_doc['ownerID']])
         
         return {
             'success': True,
@@ -1660,6 +4152,8 @@ def register():
             }, 200
       
             
+    except PasswordHasherBusy:
+        return busy_response()
     except Exception as e:
         pprint(f"Registration error: {str(e)}")
         return {'message': 'Internal server error'}, 500
@@ -1678,14 +4172,14 @@ def login():
         if not user:
             return jsonify({'message': 'Invalid credentials'}), 401
         
-        if not bcrypt.checkpw(password.encode('utf-8'), user['password']):
+        if not check_password(password, user['password']):
             return jsonify({'message': 'Invalid credentials'}), 401
             
         token = generate_token(user)
 
         users_collection.update_one(
             {'_id': user['_id']},
-            {'$set': {'lastLogin': datetime.now(cat_tz)}}
+            {'$set': {'lastLogin': datetime.now(cat_tz), **upgraded_password_fields(password, user['password'])}}
         )
         
         user_data = {
@@ -1704,9 +4198,111 @@ def login():
             'message': 'Login successful'
         })
     
+    except PasswordHasherBusy:
+        return busy_response()
     except Exception as e:
         print(f"Login error: {str(e)}")
         return jsonify({'message': 'Internal server error'}), 500
 
+"""
+#### BENCHMARKS
+"""
+
+@app.cli.group("bench")
+def bench_cli():
+    """Time hot queries against the configured database."""
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+@bench_cli.command("violations")
+@click.option("--sizes", default="10,100,1000", help="Comma separated page sizes")
+@click.option("--repeat", default=5, help="Runs per measurement")
+def bench_violations(sizes, repeat):
+    # Per-row lookups as get_violations did them before the aggregation pipeline
+    def per_row_lookups(limit):
+        for v in violations_collection.find().sort("date", -1).limit(limit):
+            officers_collection.find_one({"_id": v.get("officer_id")})
+            try:
+                vehicle = vehicles_collection.find_one({"_id": ObjectId(v.get("vehicle_id"))})
+                if vehicle:
+                    users_collection.find_one({"_id": ObjectId(vehicle.get("ownerID"))})
+            except (InvalidId, TypeError):
+                pass
+
+    for size in [int(size) for size in sizes.split(",")]:
+        loop_ms = _median_ms(lambda: per_row_lookups(size), repeat)
+        pipeline_ms = _median_ms(lambda: fetch_violations_page({}, 0, size), repeat)
+        print(f"{size:>6} rows  per-row lookups {loop_ms:9.1f} ms  pipeline {pipeline_ms:9.1f} ms")
+
+@bench_cli.command("projections")
+@click.option("--limit", default=10, help="Documents per page")
+def bench_projections(limit):
+    raw_options = CodecOptions(document_class=RawBSONDocument)
+    cases = [
+        ("applications (client list)", applications_collection, CLIENT_APPLICATION_FIELDS),
+        ("applications (admin list)", applications_collection, ADMIN_APPLICATION_FIELDS),
+        ("applications (search)", applications_collection, APPLICATION_SEARCH_FIELDS),
+        ("vehicles (client list)", vehicles_collection, CLIENT_VEHICLE_FIELDS),
+        ("vehicles (admin list)", vehicles_collection, ADMIN_VEHICLE_FIELDS),
+        ("operators", users_collection, OPERATOR_FIELDS),
+        ("officers", officers_collection, OFFICER_FIELDS),
+    ]
+    for label, collection, field_sources in cases:
+        raw_collection = collection.with_options(codec_options=raw_options)
+        projection = fields_projection(field_sources, list(field_sources))
+        full = sum(len(doc.raw) for doc in raw_collection.find().limit(limit))
+        projected = sum(len(doc.raw) for doc in raw_collection.find({}, projection).limit(limit))
+        print(f"{label:<28} full {full:>9} B  projected {projected:>9} B")
+
+@bench_cli.command("serialization")
+@click.option("--size", default=100, help="Applications per page")
+@click.option("--repeat", default=50, help="Runs per measurement")
+def bench_serialization(size, repeat):
+    # Stored applications are reused (with fresh ids) to fill the page; an empty
+    # database falls back to one representative document, with the naive UTC
+    # datetimes pymongo returns
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    documents = list(applications_collection.find().limit(size)) or [{
+        "_id": ObjectId(), "applicationId": "APP0000001", "ownerID": str(ObjectId()),
+        "operatorName": "Sample Transport", "contactPerson": "Sample Person", "email": "ops@example.com",
+        "phone": "+263770000000", "routeFrom": "Harare", "routeTo": "Bulawayo", "status": "pending",
+        "submittedDate": now.strftime("%Y-%m-%d"), "createdAt": now, "updatedAt": now,
+        "uploadedFiles": {key: f"{BLOB_PREFIX}{'0' * 64}/{key}.pdf" for key in ("vehicleDocuments", "insuranceCertificates")},
+        "timeline": [{"status": "submitted", "date": now.strftime("%Y-%m-%d"), "time": now.strftime("%H:%M"),
+                      "description": "Application submitted successfully", "completed": True}]
+    }]
+    page = [dict(documents[index % len(documents)], _id=ObjectId()) for index in range(size)]
+
+    # Before: serialize_application's field-by-field walk, then Flask's stdlib encoder
+    stdlib = DefaultJSONProvider(app)
+    copies = iter([[dict(document, timeline=[dict(event) for event in document.get("timeline", [])]) for document in page]
+                   for _ in range(repeat)])
+    def walk_and_encode():
+        walked = next(copies)
+        for application in walked:
+            application["_id"] = str(application["_id"])
+            for field in ("createdAt", "updatedAt"):
+                if isinstance(application.get(field), datetime):
+                    application[field] = application[field].isoformat()
+            for event in application["timeline"]:
+                if isinstance(event.get("date"), datetime):
+                    event["date"] = event["date"].strftime("%Y-%m-%d")
+        stdlib.dumps({"applications": walked, "success": True})
+
+    before_ms = _median_ms(walk_and_encode, repeat)
+    after_ms = _median_ms(lambda: app.json.dumps({"applications": page, "success": True}), repeat)
+    encoder = "orjson" if orjson is not None else "json"
+    print(f"{size:>6} applications  walk + stdlib json {before_ms:8.2f} ms  provider ({encoder}) {after_ms:8.2f} ms")
+
 if __name__ == "__main__":
+    try:
+        ensure_indexes()
+    except PyMongoError as e:
+        app.logger.error(f"Index bootstrap skipped: {e}")
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,26 @@
+# Tests run against the MongoDB server given by TEST_MONGO_URI (default
+# localhost) in a throwaway database, and are skipped when none answers.
+import os
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+TEST_MONGO_URI = os.environ.get("TEST_MONGO_URI", "mongodb://localhost:27017/")
+TEST_MONGO_DB = f"test_permit_administration_{uuid.uuid4().hex[:8]}"
+
+# Must be set before app is imported, since it binds its collections at import
+os.environ["MONGO_URI"] = TEST_MONGO_URI
+os.environ["MONGO_DB"] = TEST_MONGO_DB
+
+@pytest.fixture(scope="session")
+def mongo():
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {TEST_MONGO_URI}")
+    yield client
+    client.drop_database(TEST_MONGO_DB)
+    client.close()
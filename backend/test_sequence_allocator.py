@@ -0,0 +1,70 @@
+# Contention tests for SequenceAllocator. They need a MongoDB server, given by
+# TEST_MONGO_URI (default localhost), and are skipped when none answers. Each
+# run works in a throwaway database that is dropped afterwards.
+import multiprocessing
+import os
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import app as backend
+
+MONGO_URI = os.environ.get("TEST_MONGO_URI", "mongodb://localhost:27017/")
+PROCESSES = 6
+DRAWS = 250
+
+@pytest.fixture
+def database(monkeypatch):
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {MONGO_URI}")
+    name = f"test_sequence_allocator_{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(backend, "counters_collection", client[name].counters)
+    yield name
+    client.drop_database(name)
+    client.close()
+
+def bind_counters(database):
+    # Children get their own client; one inherited across fork is not safe to use
+    backend.counters_collection = MongoClient(MONGO_URI)[database].counters
+
+def draw(database, block_size, count):
+    bind_counters(database)
+    allocator = backend.SequenceAllocator("contention", block_size)
+    return [allocator.next() for _ in range(count)]
+
+shared_allocator = None
+
+def draw_shared(database, count):
+    bind_counters(database)
+    return [shared_allocator.next() for _ in range(count)]
+
+def test_ids_stay_unique_across_processes(database):
+    # A small block forces every process back to the counter many times
+    with multiprocessing.get_context("spawn").Pool(PROCESSES) as pool:
+        batches = pool.starmap(draw, [(database, 7, DRAWS)] * PROCESSES)
+
+    ids = [value for batch in batches for value in batch]
+    assert len(ids) == PROCESSES * DRAWS
+    assert len(set(ids)) == len(ids)
+    for batch in batches:
+        assert batch == sorted(batch)
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+def test_forked_workers_do_not_reuse_the_parent_block(database):
+    global shared_allocator
+    shared_allocator = backend.SequenceAllocator("forked", 50)
+    # The parent holds a mostly unused block when the workers fork
+    parent = [shared_allocator.next()]
+
+    with multiprocessing.get_context("fork").Pool(PROCESSES) as pool:
+        batches = pool.starmap(draw_shared, [(database, 20)] * PROCESSES)
+    parent += [shared_allocator.next() for _ in range(20)]
+
+    ids = parent + [value for batch in batches for value in batch]
+    assert len(set(ids)) == len(ids)
+    assert parent == list(range(1, 22))
@@ -0,0 +1,50 @@
+# Replays offline violation uploads and checks they are stored exactly once,
+# relying on the indexes the first request ensures in a fresh process.
+import pytest
+from bson import ObjectId
+
+import app as backend
+
+@pytest.fixture
+def officer_client(mongo):
+    backend.violations_collection.delete_many({})
+    officer_id = backend.officers_collection.insert_one({"firstName": "Test", "lastName": "Officer"}).inserted_id
+    vehicle_id = backend.vehicles_collection.insert_one({
+        "registrationNumber": f"T{ObjectId()}".upper()[:10],
+        "status": "approved",
+        "violationSummary": {"total": 0, "unpaid": 0, "unpaidFineCents": 0}
+    }).inserted_id
+    headers = {"Authorization": f"Bearer {backend.generate_token({'_id': officer_id})}"}
+    yield backend.app.test_client(), headers, str(vehicle_id)
+    backend.officers_collection.delete_one({"_id": officer_id})
+    backend.vehicles_collection.delete_one({"_id": vehicle_id})
+
+def violation(key, vehicle_id):
+    return {"idempotencyKey": key, "vehicle_id": vehicle_id, "violation": "Overloading", "fine": "50", "date": "2025-01-01"}
+
+def test_replayed_batch_is_stored_once(officer_client):
+    client, headers, vehicle_id = officer_client
+
+    first = client.post("/api/officer/violations/batch", headers=headers,
+                        json={"violations": [violation("k1", vehicle_id), violation("k2", vehicle_id)]})
+    assert first.status_code == 200
+    assert first.json["created"] == 2
+
+    # The device resends k1 and repeats k2 within the same batch
+    replay = client.post("/api/officer/violations/batch", headers=headers,
+                         json={"violations": [violation("k1", vehicle_id), violation("k2", vehicle_id), violation("k2", vehicle_id)]})
+    assert replay.status_code == 200
+    assert replay.json["created"] == 0
+    assert [result["status"] for result in replay.json["results"]] == ["duplicate"] * 3
+
+    assert backend.violations_collection.count_documents({"vehicle_id": ObjectId(vehicle_id)}) == 2
+    vehicle = backend.vehicles_collection.find_one({"_id": ObjectId(vehicle_id)})
+    assert vehicle["violationSummary"]["total"] == 2
+
+def test_retried_violation_is_stored_once(officer_client):
+    client, headers, vehicle_id = officer_client
+    body = violation("single", vehicle_id)
+
+    assert client.post(f"/api/officer/violations/{vehicle_id}", headers=headers, json=body).status_code == 201
+    assert client.post(f"/api/officer/violations/{vehicle_id}", headers=headers, json=body).status_code == 200
+    assert backend.violations_collection.count_documents({"idempotencyKey": "single"}) == 1